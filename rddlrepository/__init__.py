@@ -1 +1,9 @@
-from rddlrepository.core.manager import RDDLRepoManager
\ No newline at end of file
+__all__ = ['RDDLRepoManager', 'get_manager']
+
+
+def __getattr__(name):
+    # the manager is only imported on first use to keep the package import cheap
+    if name in __all__:
+        from rddlrepository.core import manager
+        return getattr(manager, name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
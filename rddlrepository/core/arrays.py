@@ -0,0 +1,144 @@
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+
+from .error import RDDLRepoSyntaxError
+from .lock import write_atomic
+from .pvariables import PVariable
+from .scanner import Text, tokenize
+
+# dtypes of the arrays of non-fluents by range: values of enumerated ranges are
+# stored as their index among the values of the enumerated type
+DTYPES = {'real': np.float64, 'int': np.int64, 'bool': np.bool_}
+
+
+def _split_statements(text: Optional[Text]) -> Iterable[List[str]]:
+    if text is None:
+        return
+    statement = []
+    for token in tokenize(text):
+        value = token.value if isinstance(token.value, str) else str(token.value, 'latin-1')
+        if value == ';':
+            if statement:
+                yield statement
+            statement = []
+        else:
+            statement.append(value)
+    if statement:
+        yield statement
+
+
+def instance_objects(text: Optional[Text]) -> Dict[str, List[str]]:
+    '''Returns the objects of each type declared by the body of the objects
+    section of an instance, in their order of declaration.'''
+    objects = {}
+    for statement in _split_statements(text):
+        if len(statement) < 4 or statement[1] != ':' or statement[2] != '{' \
+        or statement[-1] != '}':
+            raise RDDLRepoSyntaxError(
+                f'Invalid object declaration: {" ".join(statement)}.')
+        objects.setdefault(statement[0], []).extend(
+            value for value in statement[3:-1] if value != ',')
+    return objects
+
+
+def _name(value: str) -> str:
+    return value[1:] if value[:1] in ('@', '$') else value
+
+
+def _type_objects(types: Mapping[str, Any], objects: Mapping[str, List[str]]
+                  ) -> Dict[str, List[str]]:
+    '''Returns the objects or values of every type, the objects of a type being
+    followed by those of the types extending it.'''
+    result = {}
+
+    def collect(name, visiting=()):
+        if name not in result:
+            declared = types.get(name, None)
+            if isinstance(declared, list):
+                result[name] = list(declared)
+            else:
+                values = list(objects.get(name, ()))
+                for (child, parent) in types.items():
+                    if parent == name and child not in visiting:
+                        values.extend(collect(child, visiting + (name,)))
+                result[name] = values
+        return result[name]
+
+    for name in set(types) | set(objects):
+        collect(name)
+    return result
+
+
+def nonfluent_arrays(pvariables: Iterable[PVariable], types: Mapping[str, Any],
+                     objects: Mapping[str, List[str]],
+                     non_fluents: Optional[Text]) -> Dict[str, np.ndarray]:
+    '''Returns a dense array of the values of every non-fluent, given the
+    pvariables and types of a domain, the objects of an instance and the body of
+    its non-fluents section. Axes follow the order of the parameters, and
+    indices the order of declaration of the objects of each type.'''
+    type_objects = _type_objects(types, objects)
+    indices = {name: {_name(value): i for (i, value) in enumerate(values)}
+               for (name, values) in type_objects.items()}
+
+    arrays, params = {}, {}
+    for pvariable in pvariables:
+        if pvariable.category != 'non-fluent':
+            continue
+        shape = tuple(len(type_objects.get(param, ())) for param in pvariable.params)
+        default = 0 if pvariable.default is None else pvariable.default
+        if pvariable.range in indices:
+            default = indices[pvariable.range].get(_name(str(default)), 0)
+        arrays[pvariable.name] = np.full(
+            shape, default, dtype=DTYPES.get(pvariable.range, np.int64))
+        params[pvariable.name] = pvariable
+
+    # NAME(args) = value; or NAME(args); or ~NAME(args); for booleans
+    for statement in _split_statements(non_fluents):
+        negated = statement[0] in ('~', '!')
+        if negated:
+            statement = statement[1:]
+        name = statement[0]
+        pvariable = params.get(name, None)
+        if pvariable is None:
+            raise RDDLRepoSyntaxError(
+                f'Assignment to undeclared non-fluent: {" ".join(statement)}.')
+        args, position = [], 1
+        if position < len(statement) and statement[position] == '(':
+            close = statement.index(')', position)
+            args = [value for value in statement[position + 1:close] if value != ',']
+            position = close + 1
+        if len(args) != len(pvariable.params):
+            raise RDDLRepoSyntaxError(
+                f'Wrong number of arguments of non-fluent: {" ".join(statement)}.')
+        if position < len(statement) and statement[position] == '=':
+            value = ''.join(statement[position + 1:])
+        else:
+            value = 'false' if negated else 'true'
+        try:
+            index = tuple(indices[param][_name(arg)]
+                          for (param, arg) in zip(pvariable.params, args))
+        except KeyError:
+            raise RDDLRepoSyntaxError(
+                f'Undeclared object in assignment: {" ".join(statement)}.')
+        arrays[name][index] = _value(value, pvariable.range, indices)
+    return arrays
+
+
+def _value(value: str, range_: str, indices: Mapping[str, Mapping[str, int]]) -> Any:
+    if range_ in indices:
+        return indices[range_][_name(value)]
+    elif value in ('true', 'false'):
+        return value == 'true'
+    return float(value)
+
+
+def save_arrays(path: str, arrays: Mapping[str, np.ndarray]) -> None:
+    '''Writes arrays to an .npz file atomically, so that processes never read
+    a partially written file.'''
+    write_atomic(path, lambda file: np.savez(file, **arrays))
+
+
+def load_arrays(path: str) -> Dict[str, np.ndarray]:
+    with np.load(path, allow_pickle=False) as file:
+        return {name: file[name] for name in file.files}
@@ -0,0 +1,126 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Sequence, Tuple
+
+from .compress import read_rddl
+
+# default size of the file cache, which can also be set in the environment
+CACHE_BUDGET_ENV = 'RDDLREPO_CACHE_BYTES'
+DEFAULT_BUDGET = 64 * 1024 * 1024
+
+
+def file_digest(data: bytes) -> str:
+    '''Returns the content address of file contents.'''
+    import hashlib
+    return hashlib.sha256(data).hexdigest()
+
+
+class FileCache:
+    '''A least-recently-used cache of the contents of rddl files, bounded by the
+    total size of the files it holds. Contents are stored by digest, so files
+    with identical contents are held once. The path of each file read is
+    remembered with its modification time and size, and read again when these
+    change, so files that changed on disk are never served stale.'''
+
+    def __init__(self, budget: int=DEFAULT_BUDGET) -> None:
+        self.budget = budget
+        self.size = 0
+        self._entries = OrderedDict()
+        self._paths = {}
+        self._lock = threading.Lock()
+
+    def read(self, path: str, digest: Optional[str]=None, 
+             stamp: Optional[Sequence[int]]=None) -> str:
+        '''Returns the text of the (possibly compressed) file at the given path.
+        The digest of the file recorded in the manifest, if given with the 
+        modification time and size recorded with it, is trusted while the file 
+        still has them, so that a copy of cached contents is not read at all.'''
+        current = file_stamp(path)
+        with self._lock:
+            key = self._known_digest(path, current, digest, stamp)
+            entry = None if key is None else self._entries.get(key, None)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._paths[path] = (current, key)
+                return entry[0]
+        return self._load(path, current)[1]
+
+    def digest(self, path: str, digest: Optional[str]=None, 
+               stamp: Optional[Sequence[int]]=None) -> str:
+        '''Returns the digest of the current contents of the file at the given 
+        path, trusting the digest recorded in the manifest like read().'''
+        current = file_stamp(path)
+        with self._lock:
+            key = self._known_digest(path, current, digest, stamp)
+        if key is None:
+            key = self._load(path, current)[0]
+        return key
+
+    def _known_digest(self, path: str, current: Tuple[int, int], digest: Optional[str],
+                      stamp: Optional[Sequence[int]]) -> Optional[str]:
+        seen = self._paths.get(path, None)
+        if seen is not None and seen[0] == current:
+            return seen[1]
+        if digest is not None and stamp is not None and tuple(stamp) == current:
+            return digest
+        return None
+
+    def _load(self, path: str, current: Tuple[int, int]) -> Tuple[str, str]:
+        data = read_rddl(path)
+        key = file_digest(data)
+        text = decode_text(data)
+        with self._lock:
+            self._paths[path] = (current, key)
+            if key not in self._entries and len(data) <= self.budget:
+                self._entries[key] = (text, len(data))
+                self.size += len(data)
+                self._evict()
+        return key, text
+
+    def set_budget(self, budget: int) -> None:
+        with self._lock:
+            self.budget = budget
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._paths.clear()
+            self.size = 0
+
+    def _evict(self) -> None:
+        while self.size > self.budget:
+            _, entry = self._entries.popitem(last=False)
+            self.size -= entry[1]
+
+
+def file_stamp(path: str) -> Tuple[int, int]:
+    '''Returns the modification time and size of a file, which are recorded in
+    the manifest with its digest.'''
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def decode_text(data) -> str:
+    # a few files of the archive are not encoded in utf-8
+    try:
+        return str(data, 'utf-8')
+    except UnicodeDecodeError:
+        return str(data, 'latin-1')
+
+
+def _default_budget() -> int:
+    try:
+        return int(os.environ.get(CACHE_BUDGET_ENV, DEFAULT_BUDGET))
+    except ValueError:
+        return DEFAULT_BUDGET
+
+
+FILE_CACHE = FileCache(_default_budget())
+
+
+def set_cache_budget(budget: Optional[int]) -> None:
+    '''Sets the maximum total size in bytes of the files cached by the process,
+    or restores the default if None. A budget of 0 disables the cache.'''
+    FILE_CACHE.set_budget(_default_budget() if budget is None else budget)
@@ -0,0 +1,67 @@
+import os
+import re
+from typing import BinaryIO, Optional
+
+from .lock import write_atomic
+
+# instances can be stored compressed, as instance<num>.rddl.gz or .rddl.xz
+COMPRESSED_SUFFIXES = ('.gz', '.xz')
+INSTANCE_FILE = re.compile(r'instance(.+?)\.rddl(\.gz|\.xz)?')
+
+# directory of cached files, which can also be set in the environment
+CACHE_DIR_ENV = 'RDDLREPO_CACHE_DIR'
+
+_CHUNK_SIZE = 1 << 20
+
+
+def instance_number(fname: str) -> Optional[str]:
+    match = INSTANCE_FILE.fullmatch(fname)
+    return None if match is None else match.group(1)
+
+
+def open_rddl(path: str) -> BinaryIO:
+    '''Opens an rddl file for reading, decompressing it on the fly if needed.'''
+    if path.endswith('.gz'):
+        import gzip
+        return gzip.open(path, 'rb')
+    elif path.endswith('.xz'):
+        import lzma
+        return lzma.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def read_rddl(path: str) -> bytes:
+    with open_rddl(path) as file:
+        return file.read()
+
+
+def cache_dir(name: str='decompressed') -> str:
+    path = os.environ.get(CACHE_DIR_ENV, None)
+    if not path:
+        path = os.path.join(os.path.expanduser('~'), '.cache', 'rddlrepository')
+    return os.path.join(path, name)
+
+
+def decompressed_path(path: str, digest: Optional[str]=None) -> str:
+    '''Returns the path of an uncompressed copy of a compressed rddl file, which
+    is written on first request to the cache directory under the digest of its
+    contents, so that copies are shared between files and processes.'''
+    import hashlib
+    directory = cache_dir()
+    if digest is not None:
+        target = os.path.join(directory, f'{digest}.rddl')
+        if os.path.isfile(target):
+            return target
+    
+    def copy(file):
+        hasher = hashlib.sha256()
+        with open_rddl(path) as source:
+            while True:
+                chunk = source.read(_CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                file.write(chunk)
+        return os.path.join(directory, f'{hasher.hexdigest()}.rddl')
+    
+    return write_atomic(os.path.join(directory, os.path.basename(path)), copy)
@@ -32,3 +32,15 @@ class RDDLRepoManifestEmptyError(ValueError):
 
 class RDDLRepoContextNotExistError(ValueError):
     pass
+
+
+class RDDLRepoManifestFormatError(ValueError):
+    pass
+
+
+class RDDLRepoManifestReadOnlyError(ValueError):
+    pass
+
+
+class RDDLRepoSyntaxError(ValueError):
+    pass
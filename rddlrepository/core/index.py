@@ -0,0 +1,151 @@
+import bisect
+import heapq
+import json
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+NGRAM_SIZE = 3
+
+
+def _ngrams(text: str) -> List[str]:
+    text = ' ' * (NGRAM_SIZE - 1) + text.lower() + ' '
+    return list({text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)})
+
+
+class NgramIndex:
+    '''An index from character trigrams to problem names, used to find the
+    problems whose names are most similar to a query without comparing the
+    query against every name in the repository.'''
+
+    def __init__(self, names: Sequence[str], postings: Dict[str, List[int]]) -> None:
+        self.names = list(names)
+        self.postings = postings
+        self._sizes = {}
+
+    @staticmethod
+    def build(names: Sequence[str]) -> 'NgramIndex':
+        index = NgramIndex([], {})
+        for name in names:
+            index.add(name)
+        return index
+
+    @staticmethod
+    def from_bytes(data, names: Sequence[str]) -> 'NgramIndex':
+        return NgramIndex(names, json.loads(str(data, 'utf-8')))
+
+    def to_bytes(self) -> bytes:
+        return json.dumps(self.postings, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+    def add(self, name: str) -> None:
+        key = len(self.names)
+        self.names.append(name)
+        for gram in _ngrams(name):
+            self.postings.setdefault(gram, []).append(key)
+
+    def add_record(self, values: Mapping[str, Any]) -> None:
+        self.add(values['name'])
+
+    def _size(self, key: int) -> int:
+        size = self._sizes.get(key, None)
+        if size is None:
+            size = self._sizes[key] = len(_ngrams(self.names[key]))
+        return size
+
+    def search(self, query: str, limit: int=5,
+               cutoff: float=0.0) -> List[Tuple[str, float]]:
+        '''Returns up to limit (name, score) pairs ordered by decreasing Dice
+        similarity between the trigrams of the query and of the name.'''
+        grams = _ngrams(query)
+        shared = {}
+        for gram in grams:
+            for key in self.postings.get(gram, ()):
+                shared[key] = shared.get(key, 0) + 1
+        scored = []
+        for (key, count) in shared.items():
+            score = 2.0 * count / (len(grams) + self._size(key))
+            if score >= cutoff:
+                scored.append((-score, self.names[key]))
+        return [(name, -score) for (score, name) in heapq.nsmallest(limit, scored)]
+
+
+def has_viz(viz: str) -> bool:
+    return bool(viz) and viz != 'None'
+
+
+class AttributeIndex:
+    '''Inverted indexes from tags, contexts, visualizer availability and number 
+    of instances to the problems that have them, so that subsets of problems can 
+    be selected with set operations only.'''
+
+    def __init__(self, names: Sequence[str], tags: Dict[str, List[int]],
+                 contexts: Dict[str, List[int]], viz: List[int],
+                 instances: List[Tuple[int, int]]) -> None:
+        self.names = list(names)
+        self.tags = {tag: set(keys) for (tag, keys) in tags.items()}
+        self.contexts = {context: set(keys) for (context, keys) in contexts.items()}
+        self.viz = set(viz)
+        
+        # (number of instances, key) pairs sorted for range queries
+        self.instances = sorted(tuple(pair) for pair in instances)
+        self._counts = [count for (count, _) in self.instances]
+
+    @staticmethod
+    def build(records: Iterable[Mapping[str, Any]]) -> 'AttributeIndex':
+        index = AttributeIndex([], {}, {}, [], [])
+        for values in records:
+            index.add_record(values)
+        return index
+
+    @staticmethod
+    def from_bytes(data, names: Sequence[str]) -> 'AttributeIndex':
+        value = json.loads(str(data, 'utf-8'))
+        return AttributeIndex(names, value['tags'], value['contexts'], value['viz'],
+                              value['instances'])
+
+    def to_bytes(self) -> bytes:
+        value = {'tags': {tag: sorted(keys) for (tag, keys) in self.tags.items()},
+                 'contexts': {context: sorted(keys) 
+                              for (context, keys) in self.contexts.items()},
+                 'viz': sorted(self.viz),
+                 'instances': self.instances}
+        return json.dumps(value, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+    def add_record(self, values: Mapping[str, Any]) -> None:
+        key = len(self.names)
+        self.names.append(values['name'])
+        for tag in values['tags']:
+            self.tags.setdefault(tag, set()).add(key)
+        self.contexts.setdefault(values['context'], set()).add(key)
+        if has_viz(values['viz']):
+            self.viz.add(key)
+        pair = (len(values['instances']), key)
+        pos = bisect.bisect(self.instances, pair)
+        self.instances.insert(pos, pair)
+        self._counts.insert(pos, pair[0])
+
+    def query(self, tags: Iterable[str]=(), contexts: Optional[Iterable[str]]=None,
+              viz: Optional[bool]=None, min_instances: Optional[int]=None,
+              max_instances: Optional[int]=None) -> List[str]:
+        selected = []
+        for tag in tags:
+            selected.append(self.tags.get(tag, set()))
+        if contexts is not None:
+            selected.append(set().union(*(self.contexts.get(context, set()) 
+                                          for context in contexts)))
+        if min_instances is not None or max_instances is not None:
+            lo = 0 if min_instances is None else \
+                bisect.bisect_left(self._counts, min_instances)
+            hi = len(self._counts) if max_instances is None else \
+                bisect.bisect_right(self._counts, max_instances)
+            selected.append({key for (_, key) in self.instances[lo:hi]})
+        
+        # intersect the smallest sets first
+        selected.sort(key=len)
+        if selected:
+            keys = selected[0].intersection(*selected[1:])
+        else:
+            keys = set(range(len(self.names)))
+        if viz is True:
+            keys &= self.viz
+        elif viz is False:
+            keys -= self.viz
+        return sorted(self.names[key] for key in keys)
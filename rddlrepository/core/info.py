@@ -1,88 +1,354 @@
 import os.path
 import sys
-import importlib.util
-from typing import Any, Dict, List
+from typing import (
+    TYPE_CHECKING, Any, BinaryIO, Dict, List, Mapping, Optional, Tuple, Union
+)
 
 from .error import (
     RDDLRepoInstanceNotExistError,
     RDDLRepoInstanceDuplicationError,
+    RDDLRepoSyntaxError,
     RDDLRepoUnresolvedDependencyError
 )
+from .cache import FILE_CACHE, decode_text, file_digest, file_stamp
+from .compress import (
+    COMPRESSED_SUFFIXES, cache_dir, decompressed_path, instance_number, open_rddl, 
+    read_rddl
+)
+
+# the parsers are only imported when data missing from the manifest is computed
+if TYPE_CHECKING:
+    from .pvariables import PVariable
 
 sys.path.append(os.path.join('..', 'rddlrepository'))
 
 VIZ_BACKEND_PACKAGE_NAME = 'pyRDDLGym'
 DOMAIN_NAME = 'domain.rddl'
 
+# version of the cached arrays of non-fluents, part of their cache key
+ARRAYS_VERSION = 2
+
 
 class ProblemInfo:
+    
+    __slots__ = ('name', 'desc', 'loc', 'instances', 'viz', 'stats', 
+                 'digests', 'sections', 'sizes', 'stamps', '_pvariables', 
+                 '_manager', '_instance_paths')
 
-    def __init__(self, problem_data: Dict[str, Any]) -> None:
+    def __init__(self, problem_data: Mapping[str, Any], manager=None) -> None:
         self.name = problem_data['name']
         self.desc = problem_data['description']
         self.loc = problem_data['location']
-        self.instances = problem_data['instances']
         self.viz = problem_data['viz']
+        self.stats = problem_data.get('stats', None) or {}
+        self.digests = problem_data.get('digests', None) or {}
+        self.sections = problem_data.get('sections', None) or {}
+        self.sizes = problem_data.get('sizes', None) or {}
+        self.stamps = problem_data.get('stamps', None) or {}
+        self._pvariables = problem_data.get('pvariables', None)
+        self._manager = manager
+        self._set_instances(problem_data['instances'])
+    
+    def _set_instances(self, instances) -> None:
+        self.instances = tuple(instances)
+        
+        # paths of the stored files, which may be compressed
+        files = {}
+        for fname in self.digests:
+            num = instance_number(fname)
+            if num is not None:
+                files[num] = fname
+        self._instance_paths = {
+            num: os.path.join(self.loc, files.get(num, f'instance{num}.rddl'))
+            for num in self.instances}
 
     def get_domain(self) -> str:
         path = os.path.join(self.loc, DOMAIN_NAME)
         return path
 
     def get_instance(self, num: str) -> str:
-        if str(num) not in self.instances:
-            instances = ' '.join(self.instances)
-            raise RDDLRepoInstanceNotExistError(
-                f'Domain <{self.name}> does not contain instance <{num}>, '
-                f'must be one of: {instances}.')
-        instance = f'instance{num}.rddl'
-        path = os.path.join(self.loc, instance)
+        '''Returns the path of an instance. Compressed instances are decompressed
+        to a cache directory on first request.'''
+        path = self._stored_instance(num)
+        if path.endswith(COMPRESSED_SUFFIXES):
+            path = decompressed_path(path, self._recorded_digest(path))
+        return path
+    
+    def _stored_instance(self, num: str) -> str:
+        path = self._instance_paths.get(num, None)
+        if path is None:
+            path = self._instance_paths.get(str(num), None)
+            if path is None:
+                instances = ' '.join(self.instances)
+                raise RDDLRepoInstanceNotExistError(
+                    f'Domain <{self.name}> does not contain instance <{num}>, '
+                    f'must be one of: {instances}.')
         return path
 
-    def list_instances(self) -> List[str]:
+    def read_domain(self, raw: bool=False) -> Union[str, memoryview]:
+        '''Returns the rddl of the domain, from the archive pack if it was built 
+        or else from the file cache of the process, which holds files with the 
+        same contents once. If raw is True, returns the 
+        bytes of the file instead, which are not copied when read from the pack.'''
+        return self._read(DOMAIN_NAME, self.get_domain(), raw)
+    
+    def read_instance(self, num: str, raw: bool=False) -> Union[str, memoryview]:
+        '''Returns the rddl of an instance, like read_domain(). Compressed 
+        instances are decompressed in memory.'''
+        path = self._stored_instance(num)
+        return self._read(path.rpartition(os.sep)[2], path, raw)
+    
+    def open_instance(self, num: str) -> BinaryIO:
+        '''Returns a binary stream of the rddl of an instance, which decompresses
+        compressed instances as it is read.'''
+        return open_rddl(self._stored_instance(num))
+    
+    def _read(self, fname: str, path: str, raw: bool) -> Union[str, memoryview]:
+        # the pack holds the contents of the file as of the last build, which 
+        # are only read while the file is unchanged since
+        pack = None if self._manager is None else self._manager.archive_pack()
+        if pack is not None:
+            digest = self._recorded_digest(path)
+            data = None if digest is None else pack.read(digest)
+            if data is not None:
+                return data if raw else decode_text(data)
+        if raw:
+            return memoryview(read_rddl(path))
+        return FILE_CACHE.read(path, self.digests.get(fname, None), 
+                               self.stamps.get(fname, None))
+    
+    def read_section(self, num: str, section: str, 
+                     raw: bool=False) -> Union[str, memoryview, None]:
+        '''Returns the body of a section of an instance (objects, non-fluents, 
+        init-state, horizon, discount or max-nondef-actions), or None if the 
+        instance has no such section. Only the bytes of the section are read, at 
+        the offsets recorded in the manifest.'''
+        offsets = self.sections.get(str(num), None)
+        if offsets is not None and section in offsets:
+            data = self._read_range(num, *offsets[section])
+            if data is not None:
+                return data if raw else decode_text(data)
+        
+        # the section was not recorded, or the file changed since the last build
+        data = self.read_instance(num, raw=True)
+        from .scanner import section_offsets
+        offsets = section_offsets(data)
+        if section not in offsets:
+            return None
+        start, end = offsets[section]
+        return data[start:end] if raw else decode_text(data[start:end])
+    
+    def _read_range(self, num: str, start: int, end: int) -> Optional[memoryview]:
+        # offsets are only used while the file is unchanged since the last build,
+        # and a range is read with the delimiters of the section around it, which 
+        # are checked in case the file changed without changing its stamp
+        path = self._stored_instance(num)
+        digest = self._recorded_digest(path)
+        if digest is None:
+            return None
+        pack = None if self._manager is None else self._manager.archive_pack()
+        data = None
+        if pack is not None:
+            data = pack.read(digest)
+        if data is not None:
+            data = data[start - 1:end + 1]
+        else:
+            with open_rddl(path) as file:
+                file.seek(start - 1)
+                data = memoryview(file.read(end - start + 2))
+        if len(data) != end - start + 2 or data[0] not in b'{=' or data[-1] not in b'};':
+            return None
+        return data[1:-1]
+    
+    def digest(self, num: Optional[str]=None) -> str:
+        '''Returns the sha256 digest of the domain, or of an instance if a number 
+        is given. Files with identical contents have the same digest, which can 
+        be used as a cache key. The digest recorded by the last manifest build is
+        returned while the file is unchanged, otherwise the file is hashed.'''
+        if num is None:
+            path = os.path.join(self.loc, DOMAIN_NAME)
+        else:
+            path = self._stored_instance(num)
+        fname = path.rpartition(os.sep)[2]
+        return FILE_CACHE.digest(path, self.digests.get(fname, None), 
+                                 self.stamps.get(fname, None))
+    
+    def _recorded_digest(self, path: str) -> Optional[str]:
+        # the digest recorded in the manifest is that of the contents of a file 
+        # only while it has the modification time and size recorded with it
+        fname = path.rpartition(os.sep)[2]
+        digest, stamp = self.digests.get(fname, None), self.stamps.get(fname, None)
+        if digest is None or stamp is None or tuple(stamp) != file_stamp(path):
+            return None
+        return digest
+
+    def pvariables(self, category: Optional[str]=None) -> Tuple['PVariable', ...]:
+        '''Returns the signatures (name, category, parameter types, range and 
+        default) of the pvariables of the domain, as indexed by the last manifest 
+        build, optionally only those of a category such as 'state' or 'action'.'''
+        from .pvariables import PVariable, domain_pvariables
+        pvariables = self._pvariables
+        if pvariables is None:
+            pvariables = domain_pvariables(self.read_domain(raw=True))
+        elif pvariables and not isinstance(pvariables[0], PVariable):
+            pvariables = [PVariable(name, kind, tuple(params), range_, default)
+                          for (name, kind, params, range_, default) in pvariables]
+        self._pvariables = pvariables = tuple(pvariables)
+        if category is None:
+            return pvariables
+        return tuple(pvariable for pvariable in pvariables 
+                     if pvariable.category == category)
+
+    def list_instances(self) -> Tuple[str, ...]:
         return self.instances
+    
+    def instance_stats(self, num: str) -> Dict[str, Any]:
+        '''Returns the size in bytes, number of objects per type, number of 
+        non-fluent assignments, horizon and discount of an instance.'''
+        path = self._stored_instance(num)
+        stats = self.stats.get(str(num), None)
+        if stats is None:
+            from .stats import instance_stats
+            stats = instance_stats(path)
+        return stats
+
+    def estimate_ground_size(self, num: str) -> Dict[str, int]:
+        '''Returns the number of ground state, action, non-fluent, interm, derived
+        and observ variables of an instance, and their total, as computed from the 
+        pvariables of the domain and the objects of the instance without grounding 
+        it. The sizes of indexed instances are precomputed in the manifest.'''
+        self._stored_instance(num)
+        sizes = self.sizes.get(str(num), None)
+        if sizes is None:
+            from .pvariables import domain_types, ground_sizes
+            types = domain_types(self.read_domain(raw=True))
+            sizes = ground_sizes(self.pvariables(), types, 
+                                 self.instance_stats(num)['objects'])
+        return sizes
+
+    def instance_objects(self, num: str) -> Dict[str, List[str]]:
+        '''Returns the objects of each type declared by an instance, in their 
+        order of declaration.'''
+        from .arrays import instance_objects
+        return instance_objects(self.read_section(num, 'objects'))
+    
+    def nonfluent_arrays(self, num: str) -> Dict[str, Any]:
+        '''Returns a dense numpy array of the values of every non-fluent of an 
+        instance, indexed by the order of declaration of the objects of each 
+        parameter type (see instance_objects()) and of the values of enumerated 
+        types. Values of enumerated non-fluents are their index among the values 
+        of their type. The arrays are cached on disk under the digests of the 
+        domain and instance, so that they are parsed once. Raises a syntax error
+        if the instance assigns non-fluents but its non-fluents section cannot 
+        be located.'''
+        from .arrays import load_arrays, nonfluent_arrays, save_arrays
+        from .pvariables import domain_types
+        key = file_digest(
+            f'{ARRAYS_VERSION}:{self.digest()}:{self.digest(num)}'.encode('ascii'))
+        path = os.path.join(cache_dir('arrays'), f'{key}.npz')
+        if os.path.isfile(path):
+            return load_arrays(path)
+        
+        non_fluents = self.read_section(num, 'non-fluents', raw=True)
+        if non_fluents is None and self.instance_stats(num)['non_fluents']:
+            raise RDDLRepoSyntaxError(
+                f'Could not locate the non-fluents section of instance <{num}> '
+                f'of domain <{self.name}>.')
+        arrays = nonfluent_arrays(
+            self.pvariables(), domain_types(self.read_domain(raw=True)),
+            self.instance_objects(num), non_fluents)
+        save_arrays(path, arrays)
+        return arrays
 
     def get_visualizer(self) -> str:
         if self.viz == 'None':
             return None
 
+        import importlib.util
         spec = importlib.util.find_spec(VIZ_BACKEND_PACKAGE_NAME)
         if spec is None:
             raise RDDLRepoUnresolvedDependencyError(
                 f'{VIZ_BACKEND_PACKAGE_NAME} is not installed: '
                 f'it can be installed with \'pip install {VIZ_BACKEND_PACKAGE_NAME}\'.')
 
-        path_to_viz = []
-        p = os.path.split(self.loc)
-        while p[1] != 'rddlrepository':
-            path_to_viz.insert(0, p[1])
-            p = os.path.split(p[0])
-        path_to_viz.insert(0, p[1])
-        path_to_viz = '.'.join(path_to_viz)
-    
         viz = None
         viz_info = self.viz
         if viz_info:
             module, viz_class_name = viz_info.strip().split('.')
-            viz_package_name = path_to_viz + '.' + module
-            viz_package = __import__(viz_package_name, {}, {}, viz_class_name)
+            viz_package = _import_viz_module(self.loc, module)
             viz = getattr(viz_package, viz_class_name)
         return viz
     
     def __str__(self) -> str:
-        attr = self.__dict__
-        values = [f'{name}: {value}' for name, value in self.__dict__.items()]
+        values = [f'{name}: {getattr(self, name)}' 
+                  for name in ('name', 'desc', 'loc', 'instances', 'viz')]
         return '\n'.join(values)
     
     def register_instance(self, num: str, rddl: str) -> None:
-        path = os.path.join(self.loc, f'instance{num}.rddl')
-        if os.path.exists(path):
-            raise RDDLRepoInstanceDuplicationError(
-                f'Instance <{num}> already exists in domain <{self.name}>.')
-        
-        with open(path, 'w') as instance_file:
-            instance_file.write(rddl)               
-        self.instances.append(num)
-        
+        self._register_instances({num: rddl})
         print(f'Instance <{num}> was successfully registered in rddlrepository '
               f'for domain <{self.name}>.')
     
+    def register_instances(self, instances: Dict[str, str]) -> None:
+        '''Registers several instances at once, given as a dict mapping instance 
+        numbers to their rddl. All instances are staged before any of them is 
+        moved into the domain directory, and the manifest is updated once.'''
+        self._register_instances(instances)
+        print(f'{len(instances)} instances were successfully registered in '
+              f'rddlrepository for domain <{self.name}>.')
+    
+    def _register_instances(self, instances: Dict[str, str]) -> None:
+        for num in instances:
+            if str(num) in self._instance_paths:
+                raise RDDLRepoInstanceDuplicationError(
+                    f'Instance <{num}> already exists in domain <{self.name}>.')
+        
+        if self._manager is None:
+            for num in instances:
+                path = os.path.join(self.loc, f'instance{num}.rddl')
+                if os.path.exists(path):
+                    raise RDDLRepoInstanceDuplicationError(
+                        f'Instance <{num}> already exists in domain <{self.name}>.')
+            for (num, rddl) in instances.items():
+                with open(os.path.join(self.loc, f'instance{num}.rddl'), 'w') as instance_file:
+                    instance_file.write(rddl)
+            self._set_instances(self.instances + tuple(str(num) for num in instances))
+        else:
+            values = self._manager._register_instances(self.name, self.loc, instances)
+            self.loc = values['location']
+            self.stats = values['stats']
+            self.digests = values['digests']
+            self.sections = values['sections']
+            self.sizes = values['sizes']
+            self.stamps = values['stamps']
+            self._set_instances(values['instances'])
+    
+
+
+def _import_viz_module(location: str, module: str):
+    '''Imports the visualizer module of a problem. Problems of the installed
+    archive are imported as modules of the package, and problems of an overlay
+    archive are loaded from their file under a name unique to their location.'''
+    import importlib
+    import importlib.util
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    location = os.path.abspath(location)
+    if os.path.commonpath([location, package_dir]) == package_dir:
+        path = os.path.relpath(location, package_dir).split(os.sep)
+        name = '.'.join([os.path.basename(package_dir)] + path + [module])
+        return importlib.import_module(name)
+    
+    path = os.path.join(location, module + '.py')
+    key = file_digest(path.encode('utf-8'))[:16]
+    name = f'_rddlrepo_viz_{key}_{module}'
+    viz_module = sys.modules.get(name, None)
+    if viz_module is None:
+        spec = importlib.util.spec_from_file_location(name, path)
+        viz_module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = viz_module
+        try:
+            spec.loader.exec_module(viz_module)
+        except BaseException:
+            del sys.modules[name]
+            raise
+    return viz_module
@@ -0,0 +1,235 @@
+import json
+import os
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from .error import RDDLRepoManifestFormatError
+from . import table
+
+
+def manifest_stamp(path: str) -> Optional[Tuple[int, int, int]]:
+    '''Returns the modification time, inode and size of a manifest file, which 
+    change whenever the file is replaced, or None if there is no such file.'''
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+
+
+class JournaledTable(Mapping):
+    '''A read-only mapping from problem name to problem record, made of a binary
+    manifest table and of the records appended to its journal since the table
+    was built. The journal is a file of json lines, each of which holds a problem
+    record and/or updated modification times of archive directories: appending
+    to it registers a problem without rewriting the manifest.
+    
+    The journal is deleted whenever the manifest is rebuilt or compacted, and a
+    new journal then extends the new manifest: given the path and stamp of its
+    manifest, the table stops reading the journal once the manifest is replaced,
+    and a journal replaced otherwise is read again from its start.'''
+
+    def __init__(self, base: table.ManifestTable, path: Optional[str],
+                 codecs: Dict[str, int], manifest_path: Optional[str]=None,
+                 stamp: Optional[Tuple[int, int, int]]=None) -> None:
+        self.base = base
+        self.path = path
+        self.codecs = codecs
+        self.manifest_path = manifest_path
+        self.stamp = stamp
+        self.generation = 0
+        self._lock = threading.RLock()
+        self._reset()
+        self.refresh()
+
+    def _reset(self) -> None:
+        self.generation += 1
+        self._identity = None
+        self._offset = 0
+        self._records = {}
+        self._applied = []
+        self._directories = {}
+        self._names = None
+        self._contexts = None
+        self._replaced = False
+        self._derived = {}
+
+    # ==========================================================================
+    # JOURNAL
+    # ==========================================================================
+
+    def refresh(self) -> None:
+        '''Applies the entries appended to the journal since the last refresh,
+        including those written by other processes.'''
+        if self.path is None:
+            return
+        with self._lock:
+            if self.outdated():
+                return
+            try:
+                stat = os.stat(self.path)
+                identity, size = (stat.st_dev, stat.st_ino), stat.st_size
+            except FileNotFoundError:
+                identity, size = None, 0
+            offset = self._offset
+            if identity != self._identity or size < offset:
+                offset = 0
+            if size == offset:
+                if offset != self._offset:
+                    self._reset()
+                return
+            with open(self.path, 'rb') as journal_file:
+                journal_file.seek(offset)
+                data = journal_file.read(size - offset)
+            
+            # the journal read may already extend a manifest that replaced this
+            # one, since the manifest is replaced before the journal is deleted
+            if self.outdated():
+                return
+            if self._offset and (offset != self._offset or identity != self._identity):
+                self._reset()
+            self._identity = identity
+
+            # a partially written last line is left for the next refresh
+            end = data.rfind(b'\n') + 1
+            for line in data[:end].splitlines():
+                if line.strip():
+                    try:
+                        entry = json.loads(line)
+                    except ValueError as error:
+                        raise RDDLRepoManifestFormatError(
+                            f'Manifest journal {self.path} is corrupt.') from error
+                    self._apply(entry)
+            self._offset = offset + end
+    
+    def outdated(self) -> bool:
+        '''Whether the manifest of the table was replaced since it was opened.'''
+        return self.manifest_path is not None and \
+            manifest_stamp(self.manifest_path) != self.stamp
+
+    def append(self, entries: Iterable[Dict[str, Any]]) -> None:
+        '''Appends the given entries to the journal in a single write, then
+        applies them.'''
+        if self.path is None:
+            raise RDDLRepoManifestFormatError('Manifest has no journal.')
+        data = b''.join(json.dumps(entry, separators=(',', ':'), 
+                                   default=table.thaw).encode('utf-8') + b'\n'
+                        for entry in entries)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+        self.refresh()
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        self._directories.update(entry.get('directories', {}))
+        values = entry.get('record', None)
+        if values is None:
+            return
+        values = MappingProxyType({
+            key: table.decode(table.encode(value, self.codecs.get(key, table.STRING)),
+                              self.codecs.get(key, table.STRING))
+            for (key, value) in values.items()})
+        name = values['name']
+        old_values = self.get(name, None)
+        self._records[name] = values
+        self._applied.append((name, old_values is not None))
+        self._names = None
+
+        # keep the derived indexes up to date in place when possible
+        if old_values is None:
+            if self._contexts is not None:
+                context = values['context']
+                self._contexts[context] = self._contexts.get(context, ()) + (name,)
+            for (key, value) in list(self._derived.items()):
+                if hasattr(value, 'add_record'):
+                    value.add_record(values)
+                else:
+                    del self._derived[key]
+        else:
+            self._replaced = True
+            self._contexts = None
+            self._derived = {}
+
+    def journal_records(self) -> Tuple[Mapping, ...]:
+        return tuple(self._records.values())
+
+    def applied(self, start: int=0) -> Tuple[Tuple[str, bool], ...]:
+        '''Returns (name, whether it replaced a record) for the journaled records
+        in the order in which they were applied, starting from the given position.
+        The positions restart from zero whenever the generation changes.'''
+        return tuple(self._applied[start:])
+
+    @property
+    def replaced(self) -> bool:
+        '''Whether the journal overrides records of the base table.'''
+        return self._replaced
+
+    # ==========================================================================
+    # MERGED VIEWS
+    # ==========================================================================
+
+    def contexts(self) -> Dict[str, Tuple[str, ...]]:
+        with self._lock:
+            if self._contexts is None:
+                contexts = self.base.section_json('contexts') or {}
+                contexts = {context: tuple(name for name in names
+                                           if name not in self._records)
+                            for (context, names) in contexts.items()}
+                for (name, values) in self._records.items():
+                    context = values['context']
+                    contexts[context] = contexts.get(context, ()) + (name,)
+                self._contexts = contexts
+            return self._contexts
+
+    def archive_state(self) -> Optional[Dict[str, Any]]:
+        state = self.base.section_json('archive')
+        if state is not None and self._directories:
+            state['directories'].update(self._directories)
+        return state
+
+    def section(self, name: str):
+        return self.base.section(name)
+
+    def section_json(self, name: str) -> Any:
+        return self.base.section_json(name)
+
+    def derived(self, key: str, factory: Callable[['JournaledTable'], Any]) -> Any:
+        with self._lock:
+            value = self._derived.get(key, None)
+            if value is None:
+                value = self._derived[key] = factory(self)
+            return value
+
+    def names(self) -> Tuple[str, ...]:
+        with self._lock:
+            if self._names is None:
+                if self._records:
+                    names = set(self.base.names())
+                    names.update(self._records)
+                    self._names = tuple(table.sort_names(names))
+                else:
+                    self._names = self.base.names()
+            return self._names
+
+    # ==========================================================================
+    # MAPPING INTERFACE
+    # ==========================================================================
+
+    def __getitem__(self, name: str) -> Mapping:
+        values = self._records.get(name, None)
+        if values is None:
+            values = self.base[name]
+        return values
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._records or name in self.base
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names())
+
+    def __len__(self) -> int:
+        return len(self.names())
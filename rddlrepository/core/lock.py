@@ -0,0 +1,83 @@
+import errno
+import os
+import time
+from typing import Any, BinaryIO, Callable
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# seconds between attempts to take a lock held by another process on Windows
+LOCK_RETRY_INTERVAL = 0.05
+
+
+class FileLock:
+    '''An exclusive inter-process lock held on a lock file for the duration of a
+    with block. Only writers of the manifest take the lock: readers map complete
+    files that are swapped in atomically, and never wait for writers.'''
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._fd = None
+
+    def __enter__(self) -> 'FileLock':
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                # LK_LOCK gives up after 10 attempts when the lock is held by
+                # another process; other errors are raised
+                while True:
+                    try:
+                        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError as error:
+                        if error.errno not in (errno.EDEADLOCK, errno.EACCES):
+                            raise
+                        time.sleep(LOCK_RETRY_INTERVAL)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return self
+
+    def __exit__(self, *args) -> None:
+        fd, self._fd = self._fd, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+
+def write_atomic(path: str, write: Callable[[BinaryIO], Any]) -> str:
+    '''Writes a file with the given callback into a temporary file next to the 
+    path, which is then moved to the path, so that readers never see a partially
+    written file and files they mapped are replaced rather than modified. Files 
+    named by their contents are written by a callback returning their path, 
+    which is then used instead of the given path. Returns the path written.'''
+    import tempfile
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.',
+                                     suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            target = write(file)
+            file.flush()
+            os.fsync(file.fileno())
+        if isinstance(target, str):
+            path = target
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return path
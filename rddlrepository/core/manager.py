@@ -1,22 +1,68 @@
-import copy
-from datetime import datetime
-import difflib
 import os
-import importlib
-import csv
-from typing import Dict, List, Optional
+import json
+import sys
+import threading
+import time
+import warnings
+import weakref
+from typing import (
+    TYPE_CHECKING, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+)
 
 from .error import (
     RDDLRepoDomainNotExistError,
     RDDLRepoProblemDuplicationError,
     RDDLRepoManifestEmptyError,
     RDDLRepoContextNotExistError,
-    RDDLRepoContextDuplicationError
+    RDDLRepoContextDuplicationError,
+    RDDLRepoInstanceDuplicationError,
+    RDDLRepoManifestFormatError,
+    RDDLRepoManifestReadOnlyError,
+    RDDLRepoSyntaxError
 )
+from .cache import decode_text, file_digest, file_stamp
+from .compress import COMPRESSED_SUFFIXES, instance_number, read_rddl
 from .info import ProblemInfo
+from .journal import JournaledTable, manifest_stamp
+from .lock import FileLock
+from .overlay import OverlayTable
+from .pack import PACK_NAME, Pack, write_pack
+from . import table
+
+# modules only needed to build the manifest, register problems or share the 
+# manifest are imported on demand, to keep short-lived processes fast
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+    from multiprocessing.shared_memory import SharedMemory
+    from .index import AttributeIndex, NgramIndex
+
+HEADER = ['name', 'description', 'location', 'instances', 'viz', 'context', 'tags',
+          'fingerprint', 'stats', 'digests', 'sections', 'pvariables', 'sizes',
+          'stamps']
+CODECS = {'instances': table.LIST, 'tags': table.LIST, 'stats': table.JSON, 
+          'digests': table.JSON, 'sections': table.JSON, 'pvariables': table.JSON,
+          'sizes': table.JSON, 'stamps': table.JSON}
+FIELDS = [(key, CODECS.get(key, table.STRING)) for key in HEADER]
+# bump to invalidate the records of incremental builds when the scan changes
+SCAN_VERSION = 8
 
-HEADER = ['name', 'description', 'location', 'instances', 'viz', 'context', 'tags']
+# seconds during which a manifest found fresh is not checked again
+FRESHNESS_INTERVAL = 1.0
+
+# the journal is merged into the manifest once it holds this many records or
+# bytes, so that processes do not decode an ever growing journal on startup
+JOURNAL_MAX_RECORDS = 64
+JOURNAL_MAX_BYTES = 1 << 20
+
+SUGGESTION_CUTOFF = 0.3
 manifest = 'manifest.csv'
+binary_manifest = 'manifest.bin'
+journal = 'manifest.journal'
+lock = 'manifest.lock'
+STAGING_PREFIX = '.staging-'
+
+OVERLAY_ENV = 'RDDLREPO_OVERLAY'
+PACK_ENV = 'RDDLREPO_PACK'
 
 PACKAGE_NAME = 'rddlrepository'
 ARCHIVE_NAME = 'archive'
@@ -24,23 +70,116 @@ DOMAIN_NAME = 'domain.rddl'
 INFO_NAME = '__init__.py'
 
 
+_ANY_STAMP = object()
+
+# names of the shared memory blocks published by this process
+_PUBLISHED = set()
+
+
 class RDDLRepoManager:
 
-    def __init__(self, rebuild: bool=False) -> None:
-        self.archiver_dict = {}
-        self.archive_by_context = {}
-        
+    def __init__(self, rebuild: bool=False, incremental: bool=True,
+                 workers: int=1, auto_rebuild: bool=True,
+                 shared: Optional[str]=None, overlay: Optional[str]=None,
+                 pack: Optional[str]=None) -> None:
+        '''Creates a new manager for the repository.
+
+        :param rebuild: whether to (re)build the manifest from the archive
+        :param incremental: when rebuilding, only re-scan the leaf directories 
+        whose fingerprint differs from the one recorded in the current manifest
+        :param workers: number of threads used to scan the archive when building
+        :param auto_rebuild: whether to rebuild the manifest incrementally when it 
+        is out of date with the archive, or fully when it cannot be read
+        :param shared: name of a shared memory block published by share() in 
+        another process, to attach to (read-only) instead of reading the manifest
+        :param overlay: directory of a user archive with its own manifest, which is
+        merged with the installed archive and receives all registered problems, so
+        that the installed archive is never written to (defaults to the directory
+        in the RDDLREPO_OVERLAY environment variable, if set)
+        :param pack: path of the pack written by pack_archive() to read files 
+        from (defaults to the path in the RDDLREPO_PACK environment variable, if
+        set, or else to the pack next to the manifest)
+        '''
+        self._archiver_dict = None
+        self._archive_by_context = None
+        self._problems = {}
+        self._shared_memory = []
+        self._attached = shared is not None
+        self._detach = None
+        self.workers = max(1, workers)
+        self.auto_rebuild = auto_rebuild
         self.manager_path = os.path.dirname(os.path.abspath(__file__))
-        manifest_path = os.path.join(self.manager_path, manifest)
-        if os.path.isfile(manifest_path) and not rebuild:
-            try:
-                self._load_repo()
-            except:
-                raise RDDLRepoManifestEmptyError(
-                    'An error occurred while loading the repository manifest, '
-                    'please re-run with rebuild=True.')
-        else:
-            self._build_repo()
+        self.overlay_dir = None
+        if pack is None:
+            pack = os.environ.get(PACK_ENV, None) or None
+        if pack is None:
+            pack = os.path.join(self.manager_path, PACK_NAME)
+        self._pack_path = os.path.abspath(pack)
+        
+        if shared is not None:
+            block = _attach_shared_memory(shared)
+            base = table.ManifestTable(block.buf)
+            manifest_table = JournaledTable(base, None, CODECS)
+            
+            # the views of the table must be released before the block is closed,
+            # which is also done when the manager is collected or the process exits
+            self._detach = weakref.finalize(self, _detach_shared_memory, base, block)
+            self.archiver_dict = manifest_table
+            self.archive_by_context = dict(manifest_table.contexts())
+            self.auto_rebuild = False
+            return
+        
+        if overlay is None:
+            overlay = os.environ.get(OVERLAY_ENV, None) or None
+        if overlay is not None:
+            self.overlay_dir = os.path.abspath(overlay)
+            os.makedirs(os.path.join(self.overlay_dir, ARCHIVE_NAME), exist_ok=True)
+        
+        # an existing manifest is only loaded on the first query
+        for layer in self._layers():
+            if rebuild:
+                self._build_repo(incremental=incremental, layer=layer)
+            elif not os.path.isfile(layer[1]):
+                self._build_repo(incremental=incremental, expected_stamp=None, 
+                                 layer=layer)
+    
+    @property
+    def archiver_dict(self):
+        if self._archiver_dict is None:
+            self._load_repo()
+        return self._archiver_dict
+    
+    @archiver_dict.setter
+    def archiver_dict(self, value) -> None:
+        self._archiver_dict = value
+    
+    @property
+    def archive_by_context(self):
+        if self._archive_by_context is None:
+            self._load_repo()
+        return self._archive_by_context
+    
+    @archive_by_context.setter
+    def archive_by_context(self, value) -> None:
+        self._archive_by_context = value
+    
+    def _layers(self) -> List[Tuple[str, str]]:
+        '''Returns (archive directory, manifest path) of the installed archive, 
+        followed by those of the overlay archive if there is one.'''
+        layers = [(_archive_dir(), os.path.join(self.manager_path, binary_manifest))]
+        if self.overlay_dir is not None:
+            layers.append((os.path.join(self.overlay_dir, ARCHIVE_NAME),
+                           os.path.join(self.overlay_dir, binary_manifest)))
+        return layers
+    
+    def _writable_layer(self) -> Tuple[str, str]:
+        return self._layers()[-1]
+    
+    def _writable_table(self) -> JournaledTable:
+        manifest_table = self.archiver_dict
+        if isinstance(manifest_table, OverlayTable):
+            manifest_table = manifest_table.overlay
+        return manifest_table
     
     # ==========================================================================
     # GETTERS
@@ -56,26 +195,26 @@ class RDDLRepoManager:
                 result += '\n' + prefix         
         return result
         
-    def list_problems(self) -> List[str]:
+    def list_problems(self) -> Tuple[str, ...]:
         if len(self.archiver_dict) == 0:
             raise RDDLRepoManifestEmptyError(
                 'Repository manifest is empty: please re-run with rebuild=True.')        
-        return list(self.archiver_dict.keys())
+        return self.archiver_dict.names()
 
-    def list_contexts(self) -> List[str]:
+    def list_contexts(self) -> Tuple[str, ...]:
         if not self.archive_by_context:
             raise RDDLRepoManifestEmptyError(
                 'Repository manifest is empty: please re-run with rebuild=True.')        
-        return list(self.archive_by_context.keys())
+        return tuple(self.archive_by_context.keys())
 
-    def list_problems_by_context(self, context: str) -> List[str]:
+    def list_problems_by_context(self, context: str) -> Tuple[str, ...]:
         info = self.archive_by_context.get(context, None)
         if info is None:
             valid_keys = list(self.archive_by_context.keys())
             raise RDDLRepoContextNotExistError(
                 f'Context <{context}> does not exist in the repository, '
                 f'must be one of:\n' + self._print_columns(valid_keys) + '\n')
-        return copy.deepcopy(info)
+        return info
     
     def get_problems_as_string(self) -> str:
         message = ''
@@ -85,133 +224,378 @@ class RDDLRepoManager:
             message += '\n' +  self._print_columns(valid_keys, prefix='\t') + '\n'
         return message
 
+    def get_sizes_as_string(self, names: Optional[Iterable[str]]=None) -> str:
+        '''Returns a table of the estimated number of ground variables of each 
+        instance of the given problems, or of all problems. Instances whose sizes
+        cannot be estimated, because their rddl does not parse, are shown as
+        unavailable.'''
+        names = self.list_problems() if names is None else list(names)
+        categories = ['state', 'action', 'non-fluent', 'interm', 'derived', 
+                      'observ', 'total']
+        rows = [['problem', 'instance'] + categories]
+        for name in names:
+            problem = self.get_problem(name)
+            for num in problem.list_instances():
+                try:
+                    sizes = problem.estimate_ground_size(num)
+                except RDDLRepoSyntaxError:
+                    rows.append([name, num] + ['-'] * (len(categories) - 1) + 
+                                ['unavailable'])
+                    continue
+                rows.append([name, num] + [str(sizes.get(key, 0)) for key in categories])
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        return '\n'.join(
+            '  '.join(value.ljust(width) if i < 2 else value.rjust(width)
+                      for (i, (value, width)) in enumerate(zip(row, widths)))
+            for row in rows)
+
     def get_problem(self, name: str) -> ProblemInfo:
         info = self.archiver_dict.get(name, None)
+        
+        # problem infos are reused as long as the record they were made from is
+        cached = self._problems.get(name, None)
+        if cached is not None and cached[0] is info:
+            return cached[1]
 
         # print nearest matches
         if info is None:
-            matches = difflib.get_close_matches(name, self.list_problems(), n=5, cutoff=0.3)
+            matches = self.search_problems(name, limit=5, cutoff=SUGGESTION_CUTOFF)
             matches = '\n\t'.join(matches)
             raise RDDLRepoDomainNotExistError(
                 f'Domain <{name}> does not exist in the repository, did you mean:'
                 f'\n\t{matches}?\n')      
-          
-        return ProblemInfo(info)            
+        
+        problem = ProblemInfo(info, manager=self)
+        self._problems[name] = (info, problem)
+        return problem
+    
+    def search_problems(self, query: str, limit: int=10, 
+                        cutoff: float=0.0) -> List[str]:
+        '''Returns the names of up to limit problems whose names are most similar
+        to the query, most similar first, using the trigram index of the manifest.'''
+        manifest_table = self.archiver_dict
+        if len(manifest_table) == 0:
+            return []
+        ngram_index = manifest_table.derived('ngrams', _load_ngram_index)
+        return [name for (name, _) in ngram_index.search(query, limit, cutoff)]
+    
+    def query(self, tags: Union[str, Iterable[str], None]=None,
+              context: Union[str, Iterable[str], None]=None,
+              has_viz: Optional[bool]=None,
+              min_instances: Optional[int]=None,
+              max_instances: Optional[int]=None) -> List[str]:
+        '''Returns the sorted names of the problems that have all the given tags,
+        belong to any of the given contexts, have (or do not have) a visualizer,
+        and whose number of instances lies in the given range.'''
+        if isinstance(tags, str):
+            tags = [tags]
+        if isinstance(context, str):
+            context = [context]
+        manifest_table = self.archiver_dict
+        if len(manifest_table) == 0:
+            return []
+        attribute_index = manifest_table.derived('attributes', _load_attribute_index)
+        return attribute_index.query(tags=tags or (), contexts=context, viz=has_viz,
+                                     min_instances=min_instances, 
+                                     max_instances=max_instances)
     
     # ==========================================================================
     # MANIFEST HANDLING
     # ==========================================================================
     
-    def _build_repo(self) -> None:
-        root_path = os.path.dirname(os.path.abspath(__file__))
-        path_to_manifest = os.path.join(root_path, manifest)
-        root_path = os.path.split(root_path)[0]
-        archive_dir = os.path.join(root_path, ARCHIVE_NAME)
-        start_char = len(archive_dir)
-
-        # build the repo dictionary as first step to verify correctness and uniqueness
-        for root, dirs, files in os.walk(archive_dir, topdown=False):
-            dir = root[start_char:]
-            if '__pycache__' in dirs:
-                dirs.remove('__pycache__')
-            if len(dirs) > 0:
-                continue
-            d = os.path.split(root_path)
-            if d[1] == '__pycache__':
-                continue
+    def _build_repo(self, incremental: bool=True, expected_stamp=_ANY_STAMP,
+                    layer: Optional[Tuple[str, str]]=None) -> None:
+        '''Rebuilds the manifest of the given layer (by default, the one problems 
+        are registered to) while holding its lock. If an expected stamp is given, 
+        the build is skipped when the manifest no longer has that stamp once the 
+        lock is acquired, i.e. another process rebuilt it.'''
+        archive_dir, path_to_manifest = layer or self._writable_layer()
+        with FileLock(_lock_path(path_to_manifest)):
+            if expected_stamp is _ANY_STAMP \
+            or manifest_stamp(path_to_manifest) == expected_stamp:
+                self._scan_and_write(incremental, archive_dir, path_to_manifest)
+        self.archiver_dict = None
+        self.archive_by_context = None
+    
+    def _scan_and_write(self, incremental: bool, archive_dir: str, 
+                        path_to_manifest: str) -> None:
+        # records of the previous manifest are reused for leaf directories
+        # whose fingerprint did not change since the last build, and copied to
+        # the new manifest without decoding their json columns
+        import csv
+        previous, previous_state, previous_table = {}, None, None
+        if incremental:
+            try:
+                previous_table, records, previous_state = \
+                    self._read_previous_manifest(path_to_manifest)
+                previous = {values['location']: values for values in records}
+            except (OSError, csv.Error, KeyError, ValueError):
+                previous, previous_state = {}, None
+        try:
+            self._scan_leaves(archive_dir, path_to_manifest, previous, previous_state)
+        finally:
+            if previous_table is not None:
+                previous_table.close()
+    
+    def _scan_leaves(self, archive_dir: str, path_to_manifest: str, 
+                     previous: Dict[str, Mapping], previous_state: Optional[Dict]) -> None:
+        # scan the leaf directories, in parallel if requested: results come back
+        # in walk order so the merge below is deterministic
+        def _process(leaf):
+            root, files = leaf
+            return _process_leaf(archive_dir, root, files, previous.get(root, None))
+        
+        if self.workers > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                leaves, directories = _walk_leaves(archive_dir, pool=pool)
+                records = list(pool.map(_process, leaves))
+        else:
+            leaves, directories = _walk_leaves(archive_dir)
+            records = list(map(_process, leaves))
+        
+        # verify correctness and uniqueness before anything is written
+        archiver_dict = {}
+        for values in records:
+            name = values['name']
+            if name in archiver_dict:
+                raise RDDLRepoProblemDuplicationError(
+                    f'Domain <{name}> already exists: problem names must be unique.')
+            archiver_dict[name] = values
+
+        # the manifest is left as is when nothing changed since the last build, 
+        # so that the manifest mapped by every process and its indexes stay valid
+        state = _archive_state(archive_dir, directories)
+        if state == previous_state and len(records) == len(previous) \
+        and all(values is previous.get(values['location'], None) for values in records) \
+        and not os.path.exists(_journal_path(path_to_manifest)):
+            return
+
+        # Generate manifest: it is mapped back in on the next query
+        _write_manifest(path_to_manifest, records, state)
+    
+    def compact(self) -> None:
+        '''Merges the problems registered since the last build, which are 
+        recorded in the manifest journal, into the manifest itself.'''
+        manifest_table = self._writable_table()
+        _, path_to_manifest = self._writable_layer()
+        with FileLock(_lock_path(path_to_manifest)):
+            _compact_manifest(manifest_table, path_to_manifest)
+        self.archiver_dict = None
+        self.archive_by_context = None
+    
+    def _load_repo(self) -> Dict:
+        layers = [self._load_layer(layer) for layer in self._layers()]
+        if len(layers) == 1:
+            manifest_table = layers[0]
+        else:
+            manifest_table = _open_overlay(*layers)
+        self.archiver_dict = manifest_table
+        self.archive_by_context = dict(manifest_table.contexts())
+        return self.archiver_dict
+    
+    def _load_layer(self, layer: Tuple[str, str]) -> JournaledTable:
+        archive_dir, path_to_manifest = layer
+        stamp = manifest_stamp(path_to_manifest)
+        try:
+            manifest_table = _load_manifest(path_to_manifest)
+        except (OSError, ValueError, KeyError) as error:
+            if not self.auto_rebuild:
+                raise RDDLRepoManifestEmptyError(
+                    'An error occurred while loading the repository manifest, '
+                    'please re-run with rebuild=True.') from error
             
-            if "__init__.py" in files:
-                d = self._split_path_to_list(dir)
-                module = PACKAGE_NAME + '.' + ARCHIVE_NAME + '.' + '.'.join(d)
-                mymodule = importlib.import_module(module)
-                context = mymodule.info['context']
-                if context:
-                    context = '_' + context
-                name = mymodule.info['name'] + context
-                
-                if name in self.archiver_dict.keys():
-                    raise RDDLRepoProblemDuplicationError(
-                        f'Domain <{name}> already exists: problem names must be unique.')
-                if DOMAIN_NAME not in files:
-                    raise RDDLRepoDomainNotExistError(
-                        f'Domain <{name}> does not have a {DOMAIN_NAME} file.')
-                    
-                instances = [fname[8:-5] for fname in files
-                             if fname.startswith('instance') and fname.endswith('.rddl')]
-                instances.sort(key=lambda x: int(x))
-                context = mymodule.info['context']
-                if context == '':
-                    context = 'standalone'
-                self.archiver_dict[name] = {
-                    'name': name,
-                    'description': mymodule.info['description'],
-                    'location': root,
-                    'instances': instances,
-                    'viz': mymodule.info['viz'],
-                    # 'context': mymodule.info['context'],
-                    'context': context,
-                    'tags': mymodule.info['tags']
-                }
-
-                # context = mymodule.info['context']
-                # if context == '':
-                #     context = 'standalone'
-                self.archive_by_context.setdefault(context, []).append(name)
-
-        # Generate manifest
-        with open(path_to_manifest, 'w', newline='') as file:
+            # the manifest is corrupt or was written in an unknown format: it is
+            # rebuilt unless another process already replaced it in the meantime
+            self._build_repo(incremental=False, expected_stamp=stamp, layer=layer)
+            return _load_manifest(path_to_manifest)
+        
+        # the freshness check only stats the archive directories, and is skipped 
+        # if another manager of this process just did it
+        if self.auto_rebuild and _check_stale_throttled(manifest_table, archive_dir):
+            try:
+                self._build_repo(incremental=True, expected_stamp=manifest_table.stamp,
+                                 layer=layer)
+            except OSError as error:
+                warnings.warn(f'The repository manifest is out of date but could not '
+                              f'be rebuilt: {error}.')
+            manifest_table = _load_manifest(path_to_manifest)
+        return manifest_table
+    
+    def _read_previous_manifest(self, path_to_manifest: str) \
+        -> Tuple[Optional[table.ManifestTable], List[Mapping], Optional[Dict]]:
+        '''Returns the current manifest table, to be closed by the caller once 
+        done with its records, its records, which are read lazily and with their
+        json columns left encoded, and the state of the archive it was built 
+        from.'''
+        if os.path.isfile(path_to_manifest):
+            manifest_table = table.ManifestTable.open(path_to_manifest)
+            try:
+                records = [manifest_table.encoded_row(row) 
+                           for row in range(len(manifest_table))]
+                return manifest_table, records, manifest_table.section_json('archive')
+            except BaseException:
+                manifest_table.close()
+                raise
+        
+        # manifests written by older versions are in csv format
+        elif os.path.isfile(os.path.join(os.path.dirname(path_to_manifest), manifest)):
+            return None, list(_read_manifest(
+                os.path.join(os.path.dirname(path_to_manifest), manifest))), None
+        return None, [], None
+    
+    def export_csv(self, path: Optional[str]=None) -> str:
+        '''Writes the manifest in csv format, by default next to the binary 
+        manifest, and returns the path of the csv file.'''
+        import csv
+        if path is None:
+            path = os.path.join(self.manager_path, manifest)
+        with open(path, 'w', newline='') as file:
 
             # write the csv header of the manifest
             writer = csv.writer(file, delimiter=',')
             writer.writerow(HEADER)
 
             # iterate through the dictionary
-            for keys, values in self.archiver_dict.items():
-                values_copy = copy.deepcopy(values)
-                values_copy['instances'] = ','.join(values['instances'])
-                values_copy['tags'] = ','.join(values['tags'])
-                row = [values_copy[key] for key in HEADER]
+            for name in self.list_problems():
+                values = self.archiver_dict[name]
+                row = [table.encode(values[key], codec) for (key, codec) in FIELDS]
                 writer.writerow(row)
-
-    def _load_repo(self) -> Dict:
-        root_path = os.path.dirname(os.path.abspath(__file__))
-        path_to_manifest = os.path.join(root_path, manifest)
-        if not os.path.isfile(path_to_manifest):
-            return {}
-
-        self.archiver_dict = {}
-        with open(path_to_manifest) as file:
-            reader = csv.reader(file, delimiter=',')
-            for i, row in enumerate(reader):
-                if i > 0:
-                    name, *entries = row
-                    domain_info = dict(zip(HEADER[1:], entries))
-                    domain_info['name'] = name
-                    domain_info['instances'] = domain_info['instances'].split(',')                    
-                    self.archiver_dict[name] = domain_info
-                    if entries[4] == '':
-                        context = 'standalone'
-                    else:
-                        context = entries[4]
-                    self.archive_by_context.setdefault(context, []).append(name)
-            return self.archiver_dict
+        return path
 
     def _split_path_to_list(self, path):
-        l = []
-        a = os.path.split(path)
-        while a[1] != '':
-            l.insert(0, a[1])
-            a = os.path.split(a[0])
-        return l
+        return _split_path_to_list(path)
+    
+    # ==========================================================================
+    # PACKING
+    # ==========================================================================
+    
+    def pack_archive(self, path: Optional[str]=None) -> str:
+        '''Packs the domain and instance files of all problems into a single 
+        file, by default the pack of this manager, and returns its path. Files 
+        are stored by digest, and ProblemInfo reads the files that are unchanged 
+        since the last manifest build from the pack. A pack written elsewhere is 
+        read from then on by this manager, and by managers given its path.'''
+        if path is None:
+            path = self._pack_path
+        path = os.path.abspath(path)
+        manifest_table = self.archiver_dict
+        num_files, num_unique = write_pack(
+            path, (manifest_table[name] for name in manifest_table))
+        print(f'Packed {num_files} files ({num_unique} unique) of '
+              f'{len(manifest_table)} problems to {path}.')
+        self._pack_path = path
+        return path
+    
+    def archive_pack(self) -> Optional[Pack]:
+        '''Returns the pack of the archive, or None if it was not built.'''
+        return _open_pack(self._pack_path)
+    
+    # ==========================================================================
+    # SHARED MEMORY
+    # ==========================================================================
+    
+    def share(self) -> str:
+        '''Publishes the manifest of this manager, with its indexes, instance 
+        statistics and journaled problems, to a new shared memory block, and 
+        returns the name of the block. Worker processes can then create managers
+        with RDDLRepoManager(shared=name), which read the block in place.
+        
+        The block lives until unshare() is called on this manager.'''
+        manifest_table = self.archiver_dict
+        records = [manifest_table[name] 
+                   for names in manifest_table.contexts().values() for name in names]
+        data = _pack_manifest(records, manifest_table.archive_state() or {})
+        from multiprocessing import shared_memory
+        block = shared_memory.SharedMemory(create=True, size=len(data))
+        block.buf[:len(data)] = data
+        self._shared_memory.append(block)
+        _PUBLISHED.add(block.name)
+        return block.name
+    
+    def unshare(self) -> None:
+        '''Releases the shared memory blocks published by share(). A manager 
+        attached to a shared manifest is detached from it, and cannot be used 
+        afterwards.'''
+        if self._detach is not None:
+            self._detach()
+            self.archiver_dict = None
+            self.archive_by_context = None
+            self._problems = {}
+        blocks, self._shared_memory = self._shared_memory, []
+        for block in blocks:
+            block.close()
+            if block.name in _PUBLISHED:
+                _PUBLISHED.discard(block.name)
+                block.unlink()
+    
+    def close(self) -> None:
+        '''Releases the shared memory used by this manager, see unshare().'''
+        self.unshare()
     
     # ==========================================================================
     # REGISTRATION
     # ==========================================================================
     
+    def _journal(self, records: List[Dict], directories: List[str]) -> None:
+        '''Records new or updated problems in the manifest journal together with 
+        the new state of the directories that were written to (and their 
+        parents), so that the manifest is not considered stale.'''
+        manifest_table = self._writable_table()
+        archive_dir, path_to_manifest = self._writable_layer()
+        state = {}
+        for path in directories:
+            path = os.path.abspath(path)
+            while path.startswith(archive_dir):
+                state[os.path.relpath(path, archive_dir)] = _directory_state(path)
+                path = os.path.dirname(path)
+        
+        if manifest_table.path is None:
+            self._build_repo(incremental=True)
+        else:
+            entries = [{'record': dict(values)} for values in records]
+            entries.append({'directories': state})
+            with FileLock(_lock_path(manifest_table.path)):
+                if manifest_table.outdated():
+                    manifest_table = self._reload_writable_table(path_to_manifest)
+                manifest_table.append(entries)
+                compacted = _journal_too_large(manifest_table) \
+                    and _compact_manifest(manifest_table, path_to_manifest)
+            if compacted:
+                self.archiver_dict = None
+                self.archive_by_context = None
+                return
+            if manifest_table is not self.archiver_dict:
+                self.archiver_dict.refresh()
+            
+            # update the in-memory problem lists of this manager
+            for values in records:
+                context = values['context']
+                names = self.archive_by_context.get(context, ())
+                if values['name'] not in names:
+                    self.archive_by_context[context] = names + (values['name'],)
+    
+    def _reload_writable_table(self, path_to_manifest: str) -> JournaledTable:
+        # another process replaced the manifest since it was loaded, and deleted
+        # the journal: new entries extend the journal of the new manifest
+        manifest_table = _load_manifest(path_to_manifest)
+        if isinstance(self.archiver_dict, OverlayTable):
+            self.archiver_dict = _open_overlay(self.archiver_dict.base, manifest_table)
+        else:
+            self.archiver_dict = manifest_table
+        self.archive_by_context = dict(self.archiver_dict.contexts())
+        return manifest_table
+    
+    def _check_writable(self) -> None:
+        if self._attached:
+            raise RDDLRepoManifestReadOnlyError(
+                'Problems cannot be registered through a manager attached to a '
+                'shared manifest.')
+    
     def register_context(self, context: str, refresh: bool=True) -> None:
-        root_path = os.path.dirname(os.path.abspath(__file__))
-        root_path = os.path.split(root_path)[0]
-        context_dir = os.path.join(root_path, ARCHIVE_NAME, context)
+        self._check_writable()
+        archive_dir, _ = self._writable_layer()
+        context_dir = os.path.join(archive_dir, context)
         
         if context in self.archive_by_context or os.path.isdir(context_dir):
             raise RDDLRepoContextDuplicationError(
@@ -221,43 +605,649 @@ class RDDLRepoManager:
         open(os.path.join(context_dir, '__init__.py'), 'a').close()
         
         if refresh:
-            self.archive_by_context[context] = []
+            self.archive_by_context[context] = ()
+            self._journal([], [context_dir])
         
         print(f'Context <{context}> was successfully registered in rddlrepository.')
     
     def register_domain(self, name: str, context: str, rddl: str,
                         desc: Optional[str]=None, viz: str='', refresh: bool=True) -> None:
-        domains = self.list_problems_by_context(context)
-        if name in domains:
-            raise RDDLRepoProblemDuplicationError(
-                f'Domain <{name}> already exists in context <{context}>.')
+        spec = {'name': name, 'context': context, 'rddl': rddl, 'desc': desc, 'viz': viz}
+        self._register_domains([spec], refresh=refresh)
+        print(f'Domain <{name}> was successfully registered in rddlrepository '
+              f'with context <{context}>.')
+    
+    def register_batch(self, domains: List[Dict], refresh: bool=True) -> List[str]:
+        '''Registers several domains at once. Each domain is described by a dict 
+        with keys name, context and rddl, and optionally desc, viz and instances 
+        (a dict mapping instance numbers to their rddl). All files are written to
+        a staging directory first and moved into the archive only once they are 
+        complete, and the manifest is updated once for the whole batch.
         
-        root_path = os.path.dirname(os.path.abspath(__file__))
-        root_path = os.path.split(root_path)[0]
-        domain_dir = os.path.join(root_path, ARCHIVE_NAME, context, name)
-        if os.path.isdir(domain_dir):
-            raise RDDLRepoProblemDuplicationError(
-                f'Domain <{name}> already exists in context <{context}>.')
+        Returns the names of the registered problems.'''
+        names = self._register_domains(domains, refresh=refresh)
+        print(f'{len(names)} domains were successfully registered in rddlrepository.')
+        return names
+    
+    def _register_domains(self, domains: List[Dict], refresh: bool) -> List[str]:
+        import shutil
+        import tempfile
+        self._check_writable()
+        archive_dir, _ = self._writable_layer()
         
-        os.mkdir(domain_dir)
+        # validate the whole batch before writing anything
+        targets = set()
+        for spec in domains:
+            name, context = spec['name'], spec['context']
+            problems = self.list_problems_by_context(context)
+            domain_dir = os.path.join(archive_dir, context, name)
+            if name in problems or f'{name}_{context}' in self.archiver_dict \
+            or domain_dir in targets or os.path.isdir(domain_dir):
+                raise RDDLRepoProblemDuplicationError(
+                    f'Domain <{name}> already exists in context <{context}>.')
+            targets.add(domain_dir)
         
-        if desc is None:
-            desc = (f'User-defined domain with name {name} in context {context}, '
-                    f'created on {datetime.today()}.')
-        info = {'name': name, 'description': desc,
-                'context': context, 'tags': '', 'viz': viz}
+        # contexts of the installed archive are created in the overlay on demand
+        for domain_dir in targets:
+            _make_packages(archive_dir, os.path.dirname(domain_dir))
         
-        with open(os.path.join(domain_dir, INFO_NAME), 'a') as info_file:
-            info_file.write(f'info = {info}')
-        with open(os.path.join(domain_dir, DOMAIN_NAME), 'a') as domain_file:
-            domain_file.write(rddl)
+        # write every domain to the staging area, then move them into the archive
+        staging_dir = tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=archive_dir)
+        committed = []
+        try:
+            for (i, spec) in enumerate(domains):
+                _write_domain(os.path.join(staging_dir, str(i)), **spec)
+            for (i, spec) in enumerate(domains):
+                domain_dir = os.path.join(archive_dir, spec['context'], spec['name'])
+                os.rename(os.path.join(staging_dir, str(i)), domain_dir)
+                committed.append(domain_dir)
+        except BaseException:
+            for domain_dir in committed:
+                shutil.rmtree(domain_dir, ignore_errors=True)
+            raise
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
         
+        # append the new problems to the manifest journal
+        records = [_process_leaf(archive_dir, domain_dir, _list_files(domain_dir), None)
+                   for domain_dir in committed]
         if refresh:
-            self.archiver_dict = {}
-            self.archive_by_context = {}
-            self._build_repo()
-            self._load_repo()
+            self._journal(records, committed)
+        return [values['name'] for values in records]
+    
+    def _register_instances(self, name: str, location: str, 
+                            instances: Dict[str, str]) -> Dict:
+        '''Writes the given instances to a domain directory through a staging 
+        directory, and records the updated problem in the manifest journal. 
+        Domains of the installed archive are first copied to the overlay, if 
+        there is one. Returns the updated problem record.'''
+        import shutil
+        import tempfile
+        self._check_writable()
+        paths = {str(num): os.path.join(location, f'instance{num}.rddl') 
+                 for num in instances}
+        for (num, path) in paths.items():
+            if any(os.path.exists(path + suffix) for suffix in ('',) + COMPRESSED_SUFFIXES):
+                raise RDDLRepoInstanceDuplicationError(
+                    f'Instance <{num}> already exists in domain <{name}>.')
         
-        print(f'Domain <{name}> was successfully registered in rddlrepository '
-              f'with context <{context}>.')
+        archive_dir, _ = self._writable_layer()
+        if _is_within(location, archive_dir):
+            self._write_instances(location, instances)
+        else:
+            target = os.path.join(archive_dir, os.path.relpath(location, _archive_dir()))
+            if os.path.exists(target):
+                raise RDDLRepoProblemDuplicationError(
+                    f'Domain <{name}> already exists in the overlay at {target}.')
+            _make_packages(archive_dir, os.path.dirname(target))
+            staging_dir = tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=archive_dir)
+            try:
+                domain_dir = os.path.join(staging_dir, os.path.basename(location))
+                shutil.copytree(location, domain_dir, 
+                                ignore=shutil.ignore_patterns('__pycache__'))
+                for (num, rddl) in instances.items():
+                    with open(os.path.join(domain_dir, f'instance{num}.rddl'), 'w') as file:
+                        file.write(rddl)
+                os.rename(domain_dir, target)
+            finally:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+            location = target
         
+        # only the new instances need to be scanned for statistics and sections
+        previous = self.archiver_dict.get(name, None)
+        values = _process_leaf(archive_dir, location, _list_files(location), None,
+                               known=previous)
+        self._journal([values], [location])
+        return self.archiver_dict.get(name, values)
+    
+    def _write_instances(self, location: str, instances: Dict[str, str]) -> None:
+        import shutil
+        import tempfile
+        staging_dir = tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=location)
+        committed = []
+        try:
+            for (num, rddl) in instances.items():
+                with open(os.path.join(staging_dir, f'instance{num}.rddl'), 'w') as file:
+                    file.write(rddl)
+            for num in instances:
+                path = os.path.join(location, f'instance{num}.rddl')
+                os.rename(os.path.join(staging_dir, f'instance{num}.rddl'), path)
+                committed.append(path)
+        except BaseException:
+            for path in committed:
+                os.remove(path)
+            raise
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+# ==========================================================================
+# SHARED MANIFEST
+# ==========================================================================
+
+_lock = threading.RLock()
+_open_manifests = {}
+_open_overlays = {}
+_open_packs = {}
+_last_checked = {}
+_manager = None
+_manager_stamp = None
+
+
+def _open_manifest(path: str) -> JournaledTable:
+    '''Returns the memory-mapped manifest at the given path together with its 
+    journal, shared between all managers of the process until the file is 
+    replaced. Entries appended to the journal by other processes are applied.'''
+    stamp = manifest_stamp(path)
+    with _lock:
+        cached = _open_manifests.get(path, None)
+        if cached is not None and cached[0] == stamp:
+            cached[1].refresh()
+            return cached[1]
+        base = table.ManifestTable.open(path)
+        if base.section('contexts') is None:
+            raise RDDLRepoManifestFormatError('Manifest has no context section.')
+        manifest_table = JournaledTable(base, _journal_path(path), CODECS, 
+                                        manifest_path=path, stamp=stamp)
+        _open_manifests[path] = (stamp, manifest_table)
+        return manifest_table
+
+
+def _load_manifest(path: str) -> JournaledTable:
+    if not os.path.isfile(path):
+        return JournaledTable(table.EMPTY_TABLE, None, CODECS)
+    
+    # rows are decoded lazily from the memory-mapped manifest on lookup
+    return _open_manifest(path)
+
+
+def _open_overlay(base: JournaledTable, overlay: JournaledTable) -> OverlayTable:
+    '''Returns the merged view of the given manifests, shared between all 
+    managers of the process until either manifest is replaced.'''
+    with _lock:
+        key = (id(base), id(overlay))
+        cached = _open_overlays.get(key, None)
+        if cached is not None and cached.base is base and cached.overlay is overlay:
+            cached.refresh()
+            return cached
+        manifest_table = OverlayTable(base, overlay)
+        _open_overlays.clear()
+        _open_overlays[key] = manifest_table
+        return manifest_table
+
+
+def _open_pack(path: str) -> Optional[Pack]:
+    '''Returns the memory-mapped pack at the given path, or None if there is 
+    none. The file is checked for replacement at most once per freshness 
+    interval.'''
+    now = time.monotonic()
+    cached = _open_packs.get(path, None)
+    if cached is not None and now - cached[2] < FRESHNESS_INTERVAL:
+        return cached[1]
+    stamp = manifest_stamp(path)
+    with _lock:
+        if stamp is None:
+            pack = None
+        elif cached is not None and cached[0] == stamp:
+            pack = cached[1]
+        else:
+            pack = Pack.open(path)
+        _open_packs[path] = (stamp, pack, now)
+        return pack
+
+
+def _journal_path(path_to_manifest: str) -> str:
+    return os.path.join(os.path.dirname(path_to_manifest), journal)
+
+
+def _lock_path(path_to_manifest: str) -> str:
+    return os.path.join(os.path.dirname(path_to_manifest), lock)
+
+
+def _write_manifest(path_to_manifest: str, records: List[Dict], 
+                    archive_state: Dict) -> None:
+    '''Writes the records and their indexes as a new binary manifest, which 
+    replaces the current manifest and its journal. The caller must hold the 
+    manifest lock.'''
+    table.write_bytes(path_to_manifest, _pack_manifest(records, archive_state))
+    try:
+        os.remove(_journal_path(path_to_manifest))
+    except FileNotFoundError:
+        pass
+
+
+def _compact_manifest(manifest_table: JournaledTable, path_to_manifest: str) -> bool:
+    '''Merges the journal of the manifest into a new manifest, unless another 
+    process replaced the manifest in the meantime, and returns whether it did. 
+    The caller must hold the manifest lock.'''
+    if manifest_table.path is None \
+    or manifest_stamp(path_to_manifest) != manifest_table.stamp:
+        return False
+    manifest_table.refresh()
+    if not manifest_table.journal_records():
+        return False
+    records = [manifest_table[name] 
+               for names in manifest_table.contexts().values() for name in names]
+    _write_manifest(path_to_manifest, records, manifest_table.archive_state())
+    return True
+
+
+def _journal_too_large(manifest_table: JournaledTable) -> bool:
+    if len(manifest_table.applied()) >= JOURNAL_MAX_RECORDS:
+        return True
+    try:
+        return os.path.getsize(manifest_table.path) >= JOURNAL_MAX_BYTES
+    except OSError:
+        return False
+
+
+def _pack_manifest(records: List[Dict], archive_state: Dict) -> bytes:
+    from .index import AttributeIndex, NgramIndex
+    archive_by_context = {}
+    for values in records:
+        archive_by_context.setdefault(values['context'], []).append(values['name'])
+    records = sorted(records, key=lambda values: values['name'].encode('utf-8'))
+    ngram_index = NgramIndex.build(values['name'] for values in records)
+    attribute_index = AttributeIndex.build(records)
+    sections = {'archive': _dump_json(archive_state),
+                'contexts': _dump_json(archive_by_context),
+                'ngrams': ngram_index.to_bytes(),
+                'attributes': attribute_index.to_bytes()}
+    return table.pack_table(records, FIELDS, sections)
+
+
+def _detach_shared_memory(manifest_table: table.ManifestTable, 
+                          block: 'SharedMemory') -> None:
+    manifest_table.close()
+    block.close()
+
+
+def _attach_shared_memory(name: str) -> 'SharedMemory':
+    from multiprocessing import shared_memory
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    block = shared_memory.SharedMemory(name=name)
+    
+    # the block belongs to the process that created it: before Python 3.13 the
+    # resource tracker of an unrelated process would unlink it when the process 
+    # exits (worker processes share the tracker of their parent instead). The
+    # tracker registers posix names with their leading slash.
+    import multiprocessing
+    from multiprocessing import resource_tracker
+    if os.name == 'posix' and multiprocessing.parent_process() is None \
+    and name not in _PUBLISHED:
+        resource_tracker.unregister('/' + block.name.lstrip('/'), 'shared_memory')
+    return block
+
+
+def get_manager() -> RDDLRepoManager:
+    '''Returns a manager shared by the whole process, which is replaced by a new
+    one whenever the manifest file changes on disk.'''
+    global _manager, _manager_stamp
+    paths = [os.path.join(os.path.dirname(os.path.abspath(__file__)), binary_manifest)]
+    overlay = os.environ.get(OVERLAY_ENV, None) or None
+    if overlay is not None:
+        paths.append(os.path.join(os.path.abspath(overlay), binary_manifest))
+    pack = os.environ.get(PACK_ENV, None) or None
+    
+    def _stamp():
+        return (overlay, pack) + tuple((manifest_stamp(path), manifest_stamp(_journal_path(path)))
+                                  for path in paths)
+    
+    stamp = _stamp()
+    with _lock:
+        if _manager is None or stamp[2][0] is None or stamp != _manager_stamp:
+            _manager = RDDLRepoManager()
+            _manager_stamp = _stamp()
+        return _manager
+
+
+# ==========================================================================
+# ARCHIVE SCANNING
+# ==========================================================================
+
+def _walk_leaves(archive_dir: str, pool: Optional['ThreadPoolExecutor']=None) \
+    -> Tuple[List[Tuple[str, List[str]]], Dict[str, List]]:
+    '''Returns (directory, files) for every leaf package of the archive, in a 
+    deterministic order, and the state of all directories walked. If a pool is
+    given, the top-level subtrees are walked concurrently.'''
+    if pool is None:
+        return _walk_subtree(archive_dir)
+    
+    entries = list(os.scandir(archive_dir))
+    subtrees = sorted(entry.path for entry in entries
+                      if entry.is_dir() and not _is_ignored(entry.name))
+    leaves = []
+    directories = {archive_dir: _directory_state(
+        archive_dir, [entry.name for entry in entries])}
+    for (subtree_leaves, subtree_directories) in pool.map(_walk_subtree, subtrees):
+        leaves.extend(subtree_leaves)
+        directories.update(subtree_directories)
+    return leaves, directories
+
+
+def _walk_subtree(top: str) -> Tuple[List[Tuple[str, List[str]]], Dict[str, List]]:
+    leaves, directories = [], {}
+    for root, dirs, files in os.walk(top):
+        directories[root] = _directory_state(root, dirs + files)
+        dirs[:] = sorted(d for d in dirs if not _is_ignored(d))
+        if not dirs and INFO_NAME in files:
+            leaves.append((root, files))
+    return leaves, directories
+
+
+def _is_ignored(directory: str) -> bool:
+    # caches and the staging areas of registrations are not part of the archive
+    return directory == '__pycache__' or directory.startswith('.')
+
+
+def _directory_state(path: str, names: Optional[List[str]]=None) -> List:
+    '''Returns the modification time of a directory and a digest of the names
+    of its entries, leaving out caches and hidden entries.'''
+    return [os.stat(path).st_mtime_ns, _listing(path, names)]
+
+
+def _listing(path: str, names: Optional[List[str]]=None) -> str:
+    import hashlib
+    if names is None:
+        names = os.listdir(path)
+    names = sorted(name for name in names if not _is_ignored(name))
+    return hashlib.sha1('/'.join(names).encode('utf-8')).hexdigest()[:16]
+
+
+def _archive_state(archive_dir: str, directories: Dict[str, List]) -> Dict:
+    return {'root': archive_dir,
+            'directories': {os.path.relpath(path, archive_dir): state
+                            for (path, state) in directories.items()}}
+
+
+def _check_stale(manifest_table: JournaledTable, archive_dir: str) -> bool:
+    '''Returns whether the archive changed since the manifest was built, by 
+    comparing the modification times of the archive directories recorded in 
+    the manifest with the current ones: adding or removing a problem, instance
+    or context always changes the time of its parent directory. A directory 
+    whose time changed is only considered changed if its entries, other than
+    caches such as __pycache__ and hidden entries, changed too.'''
+    state = manifest_table.archive_state()
+    if state is None or state['root'] != archive_dir:
+        return True
+    for (path, recorded) in state['directories'].items():
+        path = os.path.join(archive_dir, path)
+        
+        # manifests written by older versions only record modification times
+        mtime, listing = recorded if isinstance(recorded, list) else (recorded, None)
+        try:
+            if os.stat(path).st_mtime_ns != mtime \
+            and (listing is None or _listing(path) != listing):
+                return True
+        except OSError:
+            return True
+    return False
+
+
+def _check_stale_throttled(manifest_table: JournaledTable, archive_dir: str) -> bool:
+    now = time.monotonic()
+    with _lock:
+        last_checked = _last_checked.get(id(manifest_table), None)
+        if last_checked is not None and now - last_checked < FRESHNESS_INTERVAL:
+            return False
+    stale = _check_stale(manifest_table, archive_dir)
+    if not stale:
+        with _lock:
+            _last_checked[id(manifest_table)] = now
+    return stale
+
+
+def _archive_dir() -> str:
+    root_path = os.path.split(os.path.dirname(os.path.abspath(__file__)))[0]
+    return os.path.join(root_path, ARCHIVE_NAME)
+
+
+def _is_within(path: str, directory: str) -> bool:
+    path, directory = os.path.abspath(path), os.path.abspath(directory)
+    return os.path.commonpath([path, directory]) == directory
+
+
+def _make_packages(archive_dir: str, path: str) -> None:
+    '''Creates the missing packages from the archive directory down to the path.'''
+    missing = []
+    while not os.path.isdir(path) and _is_within(path, archive_dir):
+        missing.insert(0, path)
+        path = os.path.dirname(path)
+    for path in missing:
+        os.mkdir(path)
+        open(os.path.join(path, INFO_NAME), 'a').close()
+
+
+def _process_leaf(archive_dir: str, root: str, files: List[str], 
+                  previous: Optional[Dict], known: Optional[Dict]=None) -> Dict:
+    fingerprint = _fingerprint(root, files)
+    if previous is not None and previous.get('fingerprint', '') == fingerprint \
+    and all(key in previous for key in HEADER):
+        return previous
+    values = _scan_leaf(archive_dir, root, files, known=known)
+    values['fingerprint'] = fingerprint
+    return values
+
+
+def _fingerprint(root: str, files: List[str]) -> str:
+    '''Summarizes the latest modification time, total size and file list of a 
+    leaf directory, so that changes can be detected without reading any file.'''
+    import hashlib
+    mtime, size = 0, 0
+    files = sorted(files)
+    for fname in files:
+        stat = os.stat(os.path.join(root, fname))
+        mtime = max(mtime, stat.st_mtime_ns)
+        size += stat.st_size
+    listing = hashlib.sha1('/'.join(files).encode('utf-8')).hexdigest()[:16]
+    return f'{SCAN_VERSION}:{mtime}:{size}:{listing}'
+
+
+def _scan_leaf(archive_dir: str, root: str, files: List[str],
+               known: Optional[Dict]=None) -> Dict:
+    from .pvariables import domain_pvariables, domain_types, ground_sizes
+    from .scanner import section_offsets
+    from .stats import instance_stats
+    info = _read_info(archive_dir, root)
+    context = info['context']
+    if context:
+        context = '_' + context
+    name = info['name'] + context
+    
+    if DOMAIN_NAME not in files:
+        raise RDDLRepoDomainNotExistError(
+            f'Domain <{name}> does not have a {DOMAIN_NAME} file.')
+        
+    
+    # instances may be stored compressed: the uncompressed file is preferred
+    instance_files = {}
+    for fname in sorted(files):
+        num = instance_number(fname)
+        if num is not None:
+            instance_files.setdefault(num, fname)
+    instances = sorted(instance_files, 
+                       key=lambda x: (not x.isdigit(), int(x) if x.isdigit() else 0, x))
+    context = info['context']
+    if context == '':
+        context = 'standalone'
+    
+    # every file is read once, to compute its digest, statistics, the byte
+    # offsets of its sections and ground sizes, which are those of the 
+    # uncompressed contents; digests are recorded with the modification time
+    # and size of their file, taken before it is read, so that a file edited 
+    # during the scan is never trusted to have the recorded digest; values of
+    # a record made by an older scan are not reused
+    if known is not None and \
+    not str(known.get('fingerprint', '')).startswith(f'{SCAN_VERSION}:'):
+        known = None
+    known_stats = {} if known is None else (known.get('stats', None) or {})
+    known_sections = {} if known is None else (known.get('sections', None) or {})
+    stats, sections, sizes = {}, {}, {}
+    stamps = {DOMAIN_NAME: file_stamp(os.path.join(root, DOMAIN_NAME))}
+    data = read_rddl(os.path.join(root, DOMAIN_NAME))
+    digests = {DOMAIN_NAME: file_digest(data)}
+    
+    # files that do not parse are indexed without their pvariables, statistics
+    # or sections, which are then computed on request and raise the syntax error
+    try:
+        pvariables, types = domain_pvariables(data), domain_types(data)
+    except RDDLRepoSyntaxError as error:
+        warnings.warn(f'Could not index the pvariables of domain <{name}>: {error}')
+        pvariables = types = None
+    for num in instances:
+        path = os.path.join(root, instance_files[num])
+        stamps[instance_files[num]] = file_stamp(path)
+        data = read_rddl(path)
+        digests[instance_files[num]] = file_digest(data)
+        try:
+            stats[num] = known_stats.get(num, None) or \
+                instance_stats(path, decode_text(data), size=len(data))
+            sections[num] = known_sections.get(num, None) or section_offsets(data)
+        except RDDLRepoSyntaxError as error:
+            warnings.warn(f'Could not index instance <{num}> of domain <{name}>: {error}')
+            stats[num] = sections[num] = None
+        sizes[num] = None if pvariables is None or stats[num] is None else \
+            ground_sizes(pvariables, types, stats[num]['objects'])
+    return {
+        'name': name,
+        'description': info['description'],
+        'location': root,
+        'instances': instances,
+        'viz': info['viz'],
+        'context': context,
+        'tags': _split_tags(info['tags']),
+        'stats': stats,
+        'digests': digests,
+        'sections': sections,
+        'pvariables': pvariables,
+        'sizes': sizes,
+        'stamps': stamps
+    }
+
+
+def _read_info(archive_dir: str, root: str) -> Dict:
+    '''Extracts the info dictionary of a leaf package by evaluating the literal 
+    assigned to it in the package __init__.py, without executing the module.
+    Falls back to importing the package when the info is not a plain literal.'''
+    import ast
+    path = os.path.join(root, INFO_NAME)
+    try:
+        with open(path, encoding='utf-8') as info_file:
+            tree = ast.parse(info_file.read(), filename=path)
+        info, other_refs = None, False
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 \
+            and isinstance(node.targets[0], ast.Name) and node.targets[0].id == 'info':
+                info = ast.literal_eval(node.value)
+            elif any(isinstance(child, ast.Name) and child.id == 'info'
+                     for child in ast.walk(node)):
+                other_refs = True
+        if isinstance(info, dict) and not other_refs:
+            return info
+    except (SyntaxError, ValueError, UnicodeDecodeError):
+        pass
+    
+    d = _split_path_to_list(root[len(archive_dir):])
+    module = PACKAGE_NAME + '.' + ARCHIVE_NAME + '.' + '.'.join(d)
+    import importlib
+    return importlib.import_module(module).info
+
+
+def _write_domain(domain_dir: str, name: str, context: str, rddl: str,
+                  desc: Optional[str]=None, viz: str='', 
+                  instances: Optional[Dict[str, str]]=None) -> None:
+    from datetime import datetime
+    os.mkdir(domain_dir)
+    
+    if desc is None:
+        desc = (f'User-defined domain with name {name} in context {context}, '
+                f'created on {datetime.today()}.')
+    info = {'name': name, 'description': desc,
+            'context': context, 'tags': '', 'viz': viz}
+    
+    with open(os.path.join(domain_dir, INFO_NAME), 'a') as info_file:
+        info_file.write(f'info = {info}')
+    with open(os.path.join(domain_dir, DOMAIN_NAME), 'a') as domain_file:
+        domain_file.write(rddl)
+    for (num, instance) in (instances or {}).items():
+        with open(os.path.join(domain_dir, f'instance{num}.rddl'), 'w') as instance_file:
+            instance_file.write(instance)
+
+
+def _list_files(root: str) -> List[str]:
+    return [entry.name for entry in os.scandir(root) if entry.is_file()]
+
+
+def _split_path_to_list(path: str) -> List[str]:
+    l = []
+    a = os.path.split(path)
+    while a[1] != '':
+        l.insert(0, a[1])
+        a = os.path.split(a[0])
+    return l
+
+
+def _load_ngram_index(manifest_table: JournaledTable) -> 'NgramIndex':
+    from .index import NgramIndex
+    data = manifest_table.section('ngrams')
+    if data is None:
+        return NgramIndex.build(manifest_table.names())
+    ngram_index = NgramIndex.from_bytes(data, manifest_table.base.names())
+    for values in manifest_table.journal_records():
+        if values['name'] not in manifest_table.base:
+            ngram_index.add_record(values)
+    return ngram_index
+
+
+def _load_attribute_index(manifest_table: JournaledTable) -> 'AttributeIndex':
+    from .index import AttributeIndex
+    data = manifest_table.section('attributes')
+    if data is None or manifest_table.replaced:
+        return AttributeIndex.build(manifest_table[name] for name in manifest_table)
+    attribute_index = AttributeIndex.from_bytes(data, manifest_table.base.names())
+    for values in manifest_table.journal_records():
+        attribute_index.add_record(values)
+    return attribute_index
+
+
+def _dump_json(value) -> bytes:
+    return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+def _split_tags(tags) -> List[str]:
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    return [tag.strip() for tag in tags if tag.strip()]
+
+
+def _read_manifest(path_to_manifest: str) -> Iterator[Dict]:
+    '''Yields the records of a manifest file, using the header stored in the 
+    file itself so that manifests written by older versions can still be read.'''
+    import csv
+    with open(path_to_manifest, newline='') as file:
+        reader = csv.reader(file, delimiter=',')
+        header = next(reader)
+        for row in reader:
+            yield {key: table.decode(value, CODECS.get(key, table.STRING))
+                   for (key, value) in zip(header, row)}
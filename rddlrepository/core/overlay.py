@@ -0,0 +1,141 @@
+import threading
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from .journal import JournaledTable
+from . import table
+
+
+class OverlayTable(Mapping):
+    '''A read-only mapping from problem name to problem record that merges the
+    manifest of the installed archive with the manifest of a user overlay
+    archive, whose records take precedence. Problems registered by the user are
+    written to the overlay only, so the installed archive can be read-only.'''
+
+    def __init__(self, base: JournaledTable, overlay: JournaledTable) -> None:
+        self.base = base
+        self.overlay = overlay
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._synced = {id(layer): (layer.generation, len(layer.applied()))
+                        for layer in (self.base, self.overlay)}
+        self._names = None
+        self._contexts = None
+        self._derived = {}
+
+    # ==========================================================================
+    # JOURNAL
+    # ==========================================================================
+
+    def refresh(self) -> None:
+        '''Applies the entries appended to the journals of both manifests since
+        the last refresh.'''
+        with self._lock:
+            self.base.refresh()
+            self.overlay.refresh()
+
+            # any change to the base, or a replaced record, invalidates the merged
+            # views: new overlay records are added to them in place
+            generation, start = self._synced[id(self.base)]
+            if generation != self.base.generation or self.base.applied(start):
+                self._reset()
+                return
+            generation, start = self._synced[id(self.overlay)]
+            if generation != self.overlay.generation:
+                self._reset()
+                return
+            applied = self.overlay.applied(start)
+            for (name, replaced) in applied:
+                if replaced or name in self.base:
+                    self._reset()
+                    return
+                self._add(self.overlay[name])
+            self._synced[id(self.overlay)] = (generation, start + len(applied))
+
+    def _add(self, values: Mapping) -> None:
+        name = values['name']
+        self._names = None
+        if self._contexts is not None:
+            context = values['context']
+            self._contexts[context] = self._contexts.get(context, ()) + (name,)
+        for (key, value) in list(self._derived.items()):
+            if hasattr(value, 'add_record'):
+                value.add_record(values)
+            else:
+                del self._derived[key]
+
+    # ==========================================================================
+    # MERGED VIEWS
+    # ==========================================================================
+
+    def contexts(self) -> Dict[str, Tuple[str, ...]]:
+        with self._lock:
+            if self._contexts is None:
+                contexts = dict(self.base.contexts())
+                for (context, names) in self.overlay.contexts().items():
+                    new_names = tuple(name for name in names if name not in self.base)
+                    contexts[context] = contexts.get(context, ()) + new_names
+                self._contexts = contexts
+            return self._contexts
+
+    def archive_state(self) -> Optional[Dict[str, Any]]:
+        return None
+
+    def section(self, name: str):
+        return None
+
+    def section_json(self, name: str) -> Any:
+        return None
+
+    def derived(self, key: str, factory: Callable[[Mapping], Any]) -> Any:
+        '''Returns an object computed from the merged records. It is computed from
+        the base manifest, whose stored indexes are reused, and then updated with
+        the overlay records, unless these replace some records of the base.'''
+        with self._lock:
+            value = self._derived.get(key, None)
+            if value is None:
+                names = self.overlay.names()
+                value = None
+                if not any(name in self.base for name in names):
+                    value = factory(self.base)
+                    if hasattr(value, 'add_record'):
+                        for name in names:
+                            value.add_record(self.overlay[name])
+                    elif names:
+                        value = None
+                if value is None:
+                    value = factory(self)
+                self._derived[key] = value
+            return value
+
+    def names(self) -> Tuple[str, ...]:
+        with self._lock:
+            if self._names is None:
+                if len(self.overlay):
+                    names = set(self.base.names())
+                    names.update(self.overlay.names())
+                    self._names = tuple(table.sort_names(names))
+                else:
+                    self._names = self.base.names()
+            return self._names
+
+    # ==========================================================================
+    # MAPPING INTERFACE
+    # ==========================================================================
+
+    def __getitem__(self, name: str) -> Mapping:
+        values = self.overlay.get(name, None)
+        if values is None:
+            values = self.base[name]
+        return values
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.overlay or name in self.base
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names())
+
+    def __len__(self) -> int:
+        return len(self.names())
@@ -0,0 +1,52 @@
+import os
+from typing import Iterable, Mapping, Optional, Tuple
+
+from .cache import file_digest
+from .compress import read_rddl
+from . import table
+
+# A pack is a table in the binary manifest format with one row per distinct
+# file contents, named by the digest of the contents, which are stored in the
+# string table. Problems find their files in the pack through the digests
+# recorded in the manifest: a file that changed since the pack was built has a
+# new digest, and is then read from the archive instead.
+
+PACK_NAME = 'archive.pack'
+FIELDS = [('name', table.STRING), ('data', table.BYTES)]
+
+
+def write_pack(path: str, records: Iterable[Mapping]) -> Tuple[int, int]:
+    '''Packs the uncompressed domain and instance files of the given problem 
+    records into a single file, and returns the number of files and of distinct files packed.'''
+    rows, num_files = {}, 0
+    for values in records:
+        for fname in (values['digests'] or {}):
+            data = read_rddl(os.path.join(values['location'], fname))
+            digest = file_digest(data)
+            rows[digest] = {'name': digest, 'data': data}
+            num_files += 1
+    table.write_table(path, rows.values(), FIELDS)
+    return num_files, len(rows)
+
+
+class Pack:
+    '''A memory-mapped pack of the files of the archive.'''
+
+    def __init__(self, files: table.ManifestTable) -> None:
+        self.files = files
+        self._slices = {}
+
+    @staticmethod
+    def open(path: str) -> 'Pack':
+        return Pack(table.ManifestTable.open(path))
+
+    def read(self, digest: str) -> Optional[memoryview]:
+        '''Returns the file contents with the given digest as a slice of the
+        mapped pack, or None if they are not packed.'''
+        data = self._slices.get(digest, None)
+        if data is None:
+            row = self.files.find(digest)
+            if row < 0:
+                return None
+            data = self._slices[digest] = self.files.raw(row, 1)
+        return data
@@ -0,0 +1,147 @@
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Tuple, Union
+
+from .error import RDDLRepoSyntaxError
+from .scanner import Text, find_block, scan_blocks, tokenize
+
+# categories of pvariables, named by their rddl keyword without -fluent
+CATEGORIES = {
+    'state-fluent': 'state',
+    'action-fluent': 'action',
+    'non-fluent': 'non-fluent',
+    'interm-fluent': 'interm',
+    'derived-fluent': 'derived',
+    'observ-fluent': 'observ'
+}
+
+
+class PVariable(NamedTuple):
+    '''The signature of a pvariable declared by a domain. Interm, derived and
+    observ fluents have no default.'''
+    name: str
+    category: str
+    params: Tuple[str, ...]
+    range: str
+    default: Any
+
+
+def domain_pvariables(text: Text) -> List[PVariable]:
+    '''Returns the signatures of the pvariables declared by the rddl of a domain,
+    in their order of declaration.'''
+    block = find_block(scan_blocks(text), 'pvariables')
+    if block is None:
+        return []
+    pvariables = []
+    statement = []
+    for token in tokenize(text, block.body_start, block.body_end):
+        value = token.value if isinstance(token.value, str) else str(token.value, 'latin-1')
+        if value == ';':
+            if statement:
+                pvariables.append(_parse_pvariable(statement, token.start))
+            statement = []
+        else:
+            statement.append(value)
+    if statement:
+        pvariables.append(_parse_pvariable(statement, block.body_end))
+    return pvariables
+
+
+def domain_types(text: Text) -> Dict[str, Union[str, List[str]]]:
+    '''Returns the types declared by the rddl of a domain, mapped to the type 
+    they extend (usually object), or to their values for enumerated types.'''
+    block = find_block(scan_blocks(text), 'types')
+    if block is None:
+        return {}
+    types = {}
+    statement = []
+    for token in tokenize(text, block.body_start, block.body_end):
+        value = token.value if isinstance(token.value, str) else str(token.value, 'latin-1')
+        if value != ';':
+            statement.append(value)
+            continue
+        if len(statement) < 3 or statement[1] != ':':
+            raise RDDLRepoSyntaxError(
+                f'Invalid type declaration before offset {token.start}: '
+                f'{" ".join(statement)}.')
+        if statement[2] == '{':
+            types[statement[0]] = [value for value in statement[3:-1] if value != ',']
+        else:
+            types[statement[0]] = statement[2]
+        statement = []
+    return types
+
+
+def ground_sizes(pvariables: Iterable[PVariable], types: Mapping[str, Any],
+                 objects: Mapping[str, int]) -> Dict[str, int]:
+    '''Returns the number of ground variables of each category, and in total, 
+    given the pvariables and types of a domain and the number of objects of each
+    type declared by an instance, without grounding the instance.'''
+    counts = {}
+
+    def count(name, visiting=()):
+        if name not in counts:
+            declared = types.get(name, None)
+            if isinstance(declared, list):
+                counts[name] = len(declared)
+            else:
+                # objects of a type include the objects of the types extending it
+                counts[name] = objects.get(name, 0) + sum(
+                    count(child, visiting + (name,)) for (child, parent) in types.items()
+                    if parent == name and child not in visiting)
+        return counts[name]
+
+    sizes = dict.fromkeys(CATEGORIES.values(), 0)
+    for pvariable in pvariables:
+        size = 1
+        for param in pvariable.params:
+            size *= count(param)
+        sizes[pvariable.category] = sizes.get(pvariable.category, 0) + size
+    sizes['total'] = sum(sizes.values())
+    return sizes
+
+
+def _parse_pvariable(tokens: List[str], offset: int) -> PVariable:
+
+    # name(type1, type2, ...) : { category, range, default = value, ... }
+    try:
+        name, position, params = tokens[0], 1, []
+        if tokens[position] == '(':
+            close = tokens.index(')', position)
+            params = [token for token in tokens[position + 1:close] if token != ',']
+            position = close + 1
+        if tokens[position] != ':' or tokens[position + 1] != '{' or tokens[-1] != '}':
+            raise ValueError
+        items = _split(tokens[position + 2:-1])
+        category, range_ = items[0][0], items[1][0]
+    except (IndexError, ValueError):
+        raise RDDLRepoSyntaxError(
+            f'Invalid pvariable declaration before offset {offset}: '
+            f'{" ".join(tokens)}.')
+
+    default = None
+    for item in items[2:]:
+        if len(item) > 2 and item[0] == 'default' and item[1] == '=':
+            default = _literal(''.join(item[2:]))
+    return PVariable(name, CATEGORIES.get(category, category), tuple(params),
+                     range_, default)
+
+
+def _split(tokens: Iterable[str]) -> List[List[str]]:
+    items = [[]]
+    for token in tokens:
+        if token == ',':
+            items.append([])
+        else:
+            items[-1].append(token)
+    return items
+
+
+def _literal(text: str) -> Any:
+    if text in ('true', 'false'):
+        return text == 'true'
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
@@ -0,0 +1,194 @@
+import re
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from .error import RDDLRepoSyntaxError
+
+# A small rddl lexer: tokenize() streams the tokens of (part of) a file, and
+# scan_blocks() locates its blocks in a single pass that only looks at braces,
+# semicolons and comments, so that large instances are scanned quickly. Both
+# work on str or on bytes (e.g. a slice of a memory-mapped pack), in which case
+# offsets are byte offsets.
+
+Text = Union[str, bytes, memoryview]
+
+_TOKEN_SPEC = [
+    ('comment', r'//[^\n]*|/\*(?s:.*?)\*/'),
+    ('number', r'(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?'),
+    ('variable', r'\?[A-Za-z_][\w\-]*'),
+    ('object', r'[@$][\w\-]+'),
+    ('ident', r"[A-Za-z_][\w\-]*'?"),
+    ('operator', r'<=>|=>|~=|<=|>=|==|[-+*/^|&~!<>=]'),
+    ('punct', r'[{}()\[\];,:]'),
+    ('space', r'\s+'),
+    ('invalid', r'.')
+]
+_TOKEN = '|'.join(f'(?P<{kind}>{pattern})' for (kind, pattern) in _TOKEN_SPEC)
+
+# structural tokens of the block scanner, and heads of blocks and assignments
+_STRUCTURE = r'//[^\n]*|/\*(?s:.*?)\*/|[{};]'
+_SKIP = r'(?:\s+|//[^\n]*|/\*(?s:.*?)\*/)*'
+_COMMENT = r'//[^\n]*|/\*(?s:.*?)\*/'
+_TOP_HEAD = r'([A-Za-z_][\w\-]*)\s+([A-Za-z_][\w\-]*)\s*'
+_BLOCK_HEAD = r'([A-Za-z_][\w\-]*)\s*'
+_ASSIGN_HEAD = r'([A-Za-z_][\w\-]*)\s*='
+
+# sections of instance files whose offsets are recorded in the manifest
+INSTANCE_SECTIONS = ('objects', 'non-fluents', 'init-state', 'horizon', 'discount',
+                     'max-nondef-actions')
+
+_PATTERNS = {}
+
+
+def _patterns(text: Text):
+    kind = str if isinstance(text, str) else bytes
+    patterns = _PATTERNS.get(kind, None)
+    if patterns is None:
+        compile = (lambda pattern: re.compile(pattern)) if kind is str else \
+                  (lambda pattern: re.compile(pattern.encode('ascii')))
+        patterns = _PATTERNS[kind] = {
+            name: compile(pattern) for (name, pattern) in (
+                ('token', _TOKEN), ('structure', _STRUCTURE), ('skip', _SKIP),
+                ('comment', _COMMENT), ('top', _TOP_HEAD), ('block', _BLOCK_HEAD),
+                ('assign', _ASSIGN_HEAD), ('equals', '='))}
+    return patterns
+
+
+def _str(value: Text) -> str:
+    return value if isinstance(value, str) else str(value, 'latin-1')
+
+
+class Token(NamedTuple):
+    kind: str
+    value: Text
+    start: int
+    end: int
+
+
+def tokenize(text: Text, start: int=0, end: Optional[int]=None,
+             comments: bool=False) -> Iterator[Token]:
+    '''Yields the tokens of the text between the given offsets, skipping white
+    space and, unless requested, comments. Token kinds are number, variable
+    (?x), object (@x or $x), ident, operator, punct and comment.'''
+    pattern = _patterns(text)['token']
+    end = len(text) if end is None else end
+    for match in pattern.finditer(text, start, end):
+        kind = match.lastgroup
+        if kind == 'space' or (kind == 'comment' and not comments):
+            continue
+        if kind == 'invalid':
+            raise RDDLRepoSyntaxError(
+                f'Invalid character {match.group()!r} at offset {match.start()}.')
+        yield Token(kind, match.group(), match.start(), match.end())
+
+
+class Block(NamedTuple):
+    '''A block of an rddl file. Top-level blocks (domain, non-fluents, instance)
+    have a name and children, which are their sections: blocks such as objects,
+    pvariables or cpfs, and assignments such as reward = ...; or horizon = ...;.
+    The body of a block lies between its braces, and the body of an assignment
+    between the = and the ;.'''
+    kind: str
+    name: Optional[str]
+    start: int
+    end: int
+    body_start: int
+    body_end: int
+    children: Tuple['Block', ...]
+
+
+def scan_blocks(text: Text) -> List[Block]:
+    '''Returns the top-level blocks of an rddl file with their sections.'''
+    patterns = _patterns(text)
+    blocks = []
+    opened = []
+    depth = 0
+    head = 0
+    for match in patterns['structure'].finditer(text):
+        token = match.group()
+        if token[:1] in ('/', b'/'):
+            continue
+        token = _str(token)
+
+        # the first structural token of a statement tells what the statement is
+        if head is not None:
+            start = patterns['skip'].match(text, head).end()
+            stripped = patterns['comment'].sub(
+                '' if isinstance(text, str) else b'', text[start:match.start()])
+            if depth == 0 and token == '{':
+                found = patterns['top'].fullmatch(stripped)
+                if found is None:
+                    raise RDDLRepoSyntaxError(
+                        f'Expected a block header before the brace at offset '
+                        f'{match.start()}.')
+                opened.append([_str(found.group(1)), _str(found.group(2)), start,
+                               match.end(), depth, False, []])
+            elif depth == 1 and opened:
+                found = patterns['assign'].match(stripped)
+                if found is not None:
+                    equals = patterns['equals'].search(text, start).end()
+                    opened.append([_str(found.group(1)), None, start, equals,
+                                   depth, True, []])
+                elif token == '{':
+                    found = patterns['block'].fullmatch(stripped)
+                    if found is not None:
+                        opened.append([_str(found.group(1)), None, start, match.end(),
+                                       depth, False, []])
+            head = None
+
+        if token == '{':
+            depth += 1
+        elif token == '}':
+            depth -= 1
+            if depth < 0:
+                raise RDDLRepoSyntaxError(f'Unbalanced brace at offset {match.start()}.')
+            if opened and opened[-1][4] == depth and not opened[-1][5]:
+                _close(opened, blocks, match.start(), match.end())
+        elif opened and opened[-1][4] == depth and opened[-1][5]:
+            _close(opened, blocks, match.start(), match.end())
+
+        # a statement of a top-level block starts after each brace or semicolon
+        if depth <= 1 and (token != '{' or depth == 1):
+            head = match.end()
+
+    if depth != 0 or opened:
+        raise RDDLRepoSyntaxError('Unexpected end of file inside a block.')
+    return blocks
+
+
+def _close(opened: List, blocks: List[Block], body_end: int, end: int) -> None:
+    kind, name, start, body_start, _, _, children = opened.pop()
+    block = Block(kind, name, start, end, body_start, body_end, tuple(children))
+    if opened:
+        opened[-1][6].append(block)
+    else:
+        blocks.append(block)
+
+
+def find_block(blocks: List[Block], kind: str) -> Optional[Block]:
+    '''Returns the first block of the given kind among the blocks, or among the
+    sections of the blocks if there is none.'''
+    for block in blocks:
+        if block.kind == kind:
+            return block
+    for block in blocks:
+        for child in block.children:
+            if child.kind == kind:
+                return child
+    return None
+
+
+def section_offsets(text: Text, kinds: Tuple[str, ...]=INSTANCE_SECTIONS
+                    ) -> Dict[str, Tuple[int, int]]:
+    '''Returns the offsets of the body of the first section of each of the given
+    kinds. The non-fluents section is a block, of a non-fluents file or inline
+    in an instance, not the assignment of an instance naming its non-fluents.'''
+    offsets = {}
+    for block in scan_blocks(text):
+        for section in block.children:
+            if section.kind not in kinds or section.kind in offsets:
+                continue
+            if section.kind == 'non-fluents' and \
+            _str(text[section.body_start - 1:section.body_start]) != '{':
+                continue
+            offsets[section.kind] = (section.body_start, section.body_end)
+    return offsets
@@ -0,0 +1,51 @@
+import os
+import re
+from typing import Any, Dict, Optional, Union
+
+from .cache import decode_text
+from .compress import read_rddl
+from .scanner import scan_blocks
+
+_COMMENT = re.compile(r'//[^\n]*|/\*.*?\*/', re.DOTALL)
+_OBJECT_TYPE = re.compile(r'([\w\-]+)\s*:\s*\{([^}]*)\}')
+
+
+def _number(text: str) -> Union[int, float, str]:
+    text = text.strip()
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+
+def instance_stats(path: str, rddl: Optional[str]=None, 
+                   size: Optional[int]=None) -> Dict[str, Any]:
+    '''Returns summary statistics of the instance file at the given path: its
+    (uncompressed) size in bytes, the number of objects of each type, the number
+    of non-fluent assignments, the horizon and the discount factor.'''
+    if rddl is None:
+        data = read_rddl(path)
+        rddl, size = decode_text(data), len(data)
+    objects, non_fluents, values = {}, 0, {}
+    for block in scan_blocks(rddl):
+        for section in block.children:
+            body = _COMMENT.sub('', rddl[section.body_start:section.body_end])
+            if section.kind == 'objects':
+                for (name, names) in _OBJECT_TYPE.findall(body):
+                    names = [value for value in names.split(',') if value.strip()]
+                    objects[name] = objects.get(name, 0) + len(names)
+            elif section.kind == 'non-fluents' and rddl[section.body_start - 1] == '{':
+                non_fluents += sum(1 for statement in body.split(';')
+                                   if statement.strip())
+            elif section.kind in ('horizon', 'discount'):
+                values.setdefault(section.kind, _number(body))
+
+    return {
+        'bytes': os.path.getsize(path) if size is None else size,
+        'objects': objects,
+        'non_fluents': non_fluents,
+        'horizon': values.get('horizon', None),
+        'discount': values.get('discount', None)
+    }
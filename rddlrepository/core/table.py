@@ -0,0 +1,338 @@
+import json
+import mmap
+import struct
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import (
+    Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+)
+
+from .error import RDDLRepoManifestFormatError
+from .lock import write_atomic
+
+# Layout of a binary manifest (all integers little-endian):
+#
+#   header    magic, version, #rows, #fields, #sections and the offsets of the
+#             field, row, section and string tables
+#   fields    one (string ref, codec) entry per column
+#   rows      one fixed-size entry per problem, sorted by problem name, made of
+#             one string ref per column: row i of a problem can be located with
+#             a binary search without decoding any other row
+#   sections  (name ref, offset, length) of named binary blobs, e.g. indexes
+#   strings   utf-8 string table shared by all columns, with duplicates stored
+#             only once
+#
+# A string ref is a pair (offset, length) into the string table.
+
+MAGIC = b'RDDLMAN\x00'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sIIIIQQQQ')
+_REF = struct.Struct('<II')
+_FIELD = struct.Struct('<IIB3x')
+_SECTION = struct.Struct('<IIQQ')
+
+# column codecs
+STRING = 0
+LIST = 1
+JSON = 2
+BYTES = 3
+
+
+class Encoded(bytes):
+    '''A value already encoded with the codec of its column, such as a cell of
+    another table, which is written as is.'''
+
+
+def encode(value: Any, codec: int) -> Union[str, bytes]:
+    if isinstance(value, Encoded):
+        return value
+    elif codec == STRING:
+        return str(value)
+    elif codec == BYTES:
+        return bytes(value)
+    elif codec == LIST:
+        return ','.join(value)
+    else:
+        return json.dumps(value, separators=(',', ':'), sort_keys=True, default=thaw)
+
+
+def decode(text: Union[str, bytes], codec: int) -> Any:
+    if codec == STRING or codec == BYTES:
+        return text
+    elif codec == LIST:
+        return tuple(text.split(',')) if text else ()
+    else:
+        return freeze(json.loads(text)) if text else None
+
+
+def freeze(value: Any) -> Any:
+    '''Returns a read-only copy of a decoded json value, with dicts made into
+    read-only mappings and lists into tuples, so that records shared by all 
+    callers cannot be modified.'''
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for (key, item) in value.items()})
+    elif isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    # json encoder fallback for the read-only mappings made by freeze()
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _sort_key(name: str) -> bytes:
+    return name.encode('utf-8')
+
+
+def sort_names(names: Iterable[str]) -> List[str]:
+    '''Sorts problem names in the row order of the binary manifest.'''
+    return sorted(names, key=_sort_key)
+
+
+def pack_table(records: Iterable[Dict[str, Any]],
+               fields: Sequence[Tuple[str, int]],
+               sections: Optional[Dict[str, bytes]]=None) -> bytes:
+    '''Serializes the given records into the binary manifest format. Every
+    record must contain a 'name' key, which is used as the lookup key.'''
+    sections = sections or {}
+    strings = bytearray()
+    string_refs = {}
+
+    def _ref(text: Union[str, bytes]) -> bytes:
+        data = text if isinstance(text, bytes) else text.encode('utf-8')
+        ref = string_refs.get(data, None)
+        if ref is None:
+            ref = string_refs[data] = _REF.pack(len(strings), len(data))
+            strings.extend(data)
+        return ref
+
+    field_table = bytearray()
+    for (name, codec) in fields:
+        field_table.extend(_FIELD.pack(*_REF.unpack(_ref(name)), codec))
+
+    row_table = bytearray()
+    records = sorted(records, key=lambda values: _sort_key(values['name']))
+    for values in records:
+        for (name, codec) in fields:
+            row_table.extend(_ref(encode(values.get(name, ''), codec)))
+
+    section_items = sorted(sections.items())
+    section_table = bytearray()
+    blobs = bytearray()
+    blob_start = (_HEADER.size + len(field_table) + len(row_table)
+                  + _SECTION.size * len(section_items))
+    for (name, data) in section_items:
+        ref = _REF.unpack(_ref(name))
+        section_table.extend(_SECTION.pack(*ref, blob_start + len(blobs), len(data)))
+        blobs.extend(data)
+
+    fields_offset = _HEADER.size
+    rows_offset = fields_offset + len(field_table)
+    sections_offset = rows_offset + len(row_table)
+    strings_offset = sections_offset + len(section_table) + len(blobs)
+    header = _HEADER.pack(MAGIC, VERSION, len(records), len(fields), len(section_items),
+                          fields_offset, rows_offset, sections_offset, strings_offset)
+    return b''.join([header, field_table, row_table, section_table, blobs, strings])
+
+
+def write_table(path: str, records: Iterable[Dict[str, Any]],
+                fields: Sequence[Tuple[str, int]],
+                sections: Optional[Dict[str, bytes]]=None) -> None:
+    write_bytes(path, pack_table(records, fields, sections))
+
+
+class EncodedRow(Mapping):
+    '''A row of a manifest table whose cells are read on access: string and list
+    cells are decoded, and json and bytes cells are returned as Encoded copies.
+    The table must stay open while the row is read.'''
+
+    def __init__(self, manifest_table: 'ManifestTable', row: int) -> None:
+        self._table = manifest_table
+        self._row = row
+        self._columns = {name: (column, codec) 
+                         for (column, (name, codec)) in enumerate(manifest_table.fields)}
+        self._values = {}
+
+    def __getitem__(self, name: str) -> Any:
+        value = self._values.get(name, None)
+        if value is None:
+            column, codec = self._columns[name]
+            data = self._table.raw(self._row, column)
+            if codec == JSON or codec == BYTES:
+                value = Encoded(data)
+            else:
+                value = decode(str(data, 'utf-8'), codec)
+            self._values[name] = value
+        return value
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._columns
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._columns)
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+
+def write_bytes(path: str, data: bytes) -> None:
+    # the old manifest may still be memory-mapped by readers, so it must be 
+    # replaced rather than truncated and rewritten in place
+    write_atomic(path, lambda file: file.write(data))
+
+
+class ManifestTable(Mapping):
+    '''A read-only mapping from problem name to problem record, backed by a
+    buffer in the binary manifest format. Records are decoded on first access 
+    only, into read-only views that are shared by all later lookups.'''
+
+    def __init__(self, buffer) -> None:
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+        if len(self._view) < _HEADER.size:
+            raise RDDLRepoManifestFormatError('Manifest is truncated.')
+        (magic, version, self._num_rows, num_fields, num_sections, fields_offset,
+         self._rows_offset, sections_offset, self._strings_offset) = \
+            _HEADER.unpack_from(self._view, 0)
+        if magic != MAGIC:
+            raise RDDLRepoManifestFormatError('File is not a binary manifest.')
+        if version != VERSION:
+            raise RDDLRepoManifestFormatError(
+                f'Manifest version {version} is not supported, expected {VERSION}.')
+        if self._strings_offset > len(self._view):
+            raise RDDLRepoManifestFormatError('Manifest is truncated.')
+
+        self.fields = []
+        for i in range(num_fields):
+            offset, length, codec = _FIELD.unpack_from(
+                self._view, fields_offset + i * _FIELD.size)
+            self.fields.append((self._string(offset, length), codec))
+        self._row_size = _REF.size * num_fields
+
+        self._rows = {}
+        self._found = {}
+        self._names = None
+        self._derived = {}
+        self._sections = {}
+        for i in range(num_sections):
+            offset, length, start, size = _SECTION.unpack_from(
+                self._view, sections_offset + i * _SECTION.size)
+            self._sections[self._string(offset, length)] = (start, size)
+
+    @staticmethod
+    def open(path: str) -> 'ManifestTable':
+        with open(path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return ManifestTable(buffer)
+
+    def close(self) -> None:
+        self._view.release()
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    # ==========================================================================
+    # DECODING
+    # ==========================================================================
+
+    def _raw(self, offset: int, length: int) -> memoryview:
+        start = self._strings_offset + offset
+        return self._view[start:start + length]
+
+    def _string(self, offset: int, length: int) -> str:
+        return str(self._raw(offset, length), 'utf-8')
+
+    def _cell(self, row: int, column: int) -> Tuple[int, int]:
+        return _REF.unpack_from(
+            self._view, self._rows_offset + row * self._row_size + column * _REF.size)
+
+    def _name(self, row: int) -> str:
+        return self._string(*self._cell(row, 0))
+
+    def find(self, name: str) -> int:
+        '''Returns the row index of the given problem, or -1 if not found.'''
+        row = self._found.get(name, None)
+        if row is not None:
+            return row
+        key = name.encode('utf-8')
+        lo, hi = 0, self._num_rows
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = self._raw(*self._cell(mid, 0))
+            if value == key:
+                self._found[name] = mid
+                return mid
+            elif value.tobytes() < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return -1
+
+    def raw(self, row: int, column: int) -> memoryview:
+        '''Returns the encoded value of a cell without copying it.'''
+        return self._raw(*self._cell(row, column))
+
+    def row(self, row: int) -> Mapping:
+        values = self._rows.get(row, None)
+        if values is None:
+            values = MappingProxyType({
+                name: self.raw(row, column).tobytes() if codec == BYTES else
+                      decode(self._string(*self._cell(row, column)), codec)
+                for (column, (name, codec)) in enumerate(self.fields)})
+            self._rows[row] = values
+        return values
+
+    def encoded_row(self, row: int) -> 'EncodedRow':
+        '''Returns a view of a row whose cells are only read on access, with its
+        json and bytes columns left encoded, so that the row can be compared and
+        copied to a new table without decoding it.'''
+        return EncodedRow(self, row)
+
+    def section(self, name: str) -> Optional[memoryview]:
+        location = self._sections.get(name, None)
+        if location is None:
+            return None
+        start, size = location
+        return self._view[start:start + size]
+
+    def section_json(self, name: str) -> Any:
+        data = self.section(name)
+        return None if data is None else json.loads(str(data, 'utf-8'))
+    
+    def derived(self, key: str, factory: Callable[['ManifestTable'], Any]) -> Any:
+        '''Returns an object computed from this table (e.g. an index decoded from 
+        one of its sections), computing it with the factory on first request.'''
+        value = self._derived.get(key, None)
+        if value is None:
+            value = self._derived[key] = factory(self)
+        return value
+
+    # ==========================================================================
+    # MAPPING INTERFACE
+    # ==========================================================================
+
+    def __getitem__(self, name: str) -> Mapping:
+        row = self.find(name)
+        if row < 0:
+            raise KeyError(name)
+        return self.row(row)
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and self.find(name) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names())
+
+    def __len__(self) -> int:
+        return self._num_rows
+
+    def names(self) -> Tuple[str, ...]:
+        if self._names is None:
+            self._names = tuple(self._name(row) for row in range(self._num_rows))
+        return self._names
+
+
+EMPTY_TABLE = ManifestTable(pack_table([], [('name', STRING)]))
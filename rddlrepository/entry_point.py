@@ -13,17 +13,49 @@ def main():
     parser_build = subparsers.add_parser("build", 
                                          help="(re)build the manifest file that archives all problem paths",
                                          epilog=EPILOG)
+    parser_build.add_argument("--full", action="store_true",
+                              help="re-scan every directory instead of only the ones that changed")
+    parser_build.add_argument("-j", "--jobs", type=int, default=1,
+                              help="number of threads used to scan the archive")
+    parser_build.add_argument("--csv", action="store_true",
+                              help="also export the manifest in csv format")
     
     # listing
     parser_list = subparsers.add_parser("list",
                                         help="list all problems by context",
                                         epilog=EPILOG)
 
+    # packing
+    parser_pack = subparsers.add_parser("pack",
+                                        help="pack all domain and instance files into a single file",
+                                        epilog=EPILOG)
+    parser_pack.add_argument("-o", "--output", type=str, default=None,
+                             help="path of the pack (by default, the path in RDDLREPO_PACK or "
+                                  "else next to the manifest), which is read when set in RDDLREPO_PACK")
+
+    # searching
+    parser_search = subparsers.add_parser("search",
+                                          help="find the problems whose names best match a query",
+                                          epilog=EPILOG)
+    parser_search.add_argument("query", type=str, help="(part of) the name of a problem")
+    parser_search.add_argument("-n", "--limit", type=int, default=10,
+                               help="maximum number of problems to return")
+
+    # sizing
+    parser_sizes = subparsers.add_parser("sizes",
+                                         help="estimate the number of ground variables of every instance",
+                                         epilog=EPILOG)
+    parser_sizes.add_argument("problems", type=str, nargs="*",
+                              help="names of the problems (by default, all problems)")
+
     # dispatch
     args = parser.parse_args()
     if args.rddlrepo == "build":
         from rddlrepository.core.manager import RDDLRepoManager
-        manager = RDDLRepoManager(rebuild=True)
+        manager = RDDLRepoManager(rebuild=True, incremental=not args.full,
+                                  workers=args.jobs)
+        if args.csv:
+            print(f'Exported manifest to {manager.export_csv()}.')
         num_context = len(manager.list_contexts())
         num_problems = len(manager.list_problems())
         print(f'Successfully built rddlrepository manifest: '
@@ -33,6 +65,22 @@ def main():
         from rddlrepository.core.manager import RDDLRepoManager
         manager = RDDLRepoManager()
         print(manager.get_problems_as_string())
+    
+    elif args.rddlrepo == "pack":
+        from rddlrepository.core.manager import RDDLRepoManager
+        manager = RDDLRepoManager()
+        manager.pack_archive(args.output)
+    
+    elif args.rddlrepo == "sizes":
+        from rddlrepository.core.manager import RDDLRepoManager
+        manager = RDDLRepoManager()
+        print(manager.get_sizes_as_string(args.problems or None))
+    
+    elif args.rddlrepo == "search":
+        from rddlrepository.core.manager import RDDLRepoManager
+        manager = RDDLRepoManager()
+        for name in manager.search_problems(args.query, limit=args.limit):
+            print(name)
         
     else:
         parser.print_help()
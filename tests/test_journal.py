@@ -0,0 +1,70 @@
+import json
+import os
+
+from rddlrepository.core import table
+from rddlrepository.core.journal import JournaledTable, manifest_stamp
+
+FIELDS = [('name', table.STRING), ('context', table.STRING), ('tags', table.LIST)]
+CODECS = {'tags': table.LIST}
+
+
+def _write_manifest(directory, names):
+    path = os.path.join(directory, 'manifest.bin')
+    records = [{'name': name, 'context': 'ctx', 'tags': []} for name in names]
+    contexts = json.dumps({'ctx': list(names)}).encode('utf-8')
+    table.write_bytes(path, table.pack_table(records, FIELDS, {'contexts': contexts}))
+    try:
+        os.remove(os.path.join(directory, 'manifest.journal'))
+    except FileNotFoundError:
+        pass
+    return path
+
+
+def _open(path):
+    return JournaledTable(table.ManifestTable.open(path), 
+                          os.path.join(os.path.dirname(path), 'manifest.journal'), 
+                          CODECS, manifest_path=path, stamp=manifest_stamp(path))
+
+
+def _record(name, description=''):
+    return {'record': {'name': name, 'context': 'ctx', 'tags': [], 
+                       'description': description}}
+
+
+def test_journal_entries_are_applied(tmp_path):
+    path = _write_manifest(str(tmp_path), ['base'])
+    manifest_table = _open(path)
+    _open(path).append([_record('added')])
+    manifest_table.refresh()
+    assert set(manifest_table) == {'base', 'added'}
+
+
+def test_refresh_after_manifest_replaced(tmp_path):
+    path = _write_manifest(str(tmp_path), ['base'])
+    old_table = _open(path)
+    old_table.append([_record('first')])
+
+    # another process rebuilds the manifest, deleting the journal, and a third
+    # one appends past the offset the old table read up to
+    _write_manifest(str(tmp_path), ['base', 'first'])
+    new_table = _open(path)
+    new_table.append([_record('second', 'x' * 8192)])
+    old_table.refresh()
+    assert old_table.outdated()
+    assert set(old_table) == {'base', 'first'}
+    assert set(_open(path)) == {'base', 'first', 'second'}
+
+
+def test_refresh_after_journal_replaced(tmp_path):
+    path = _write_manifest(str(tmp_path), ['base'])
+    manifest_table = _open(path)
+    manifest_table.append([_record('first')])
+
+    # a journal of the same manifest replaced by another one of the same size
+    journal_path = os.path.join(str(tmp_path), 'manifest.journal')
+    with open(journal_path + '.tmp', 'w') as journal_file:
+        journal_file.write(json.dumps(_record('firsx'), separators=(',', ':')) + '\n')
+    assert os.path.getsize(journal_path + '.tmp') == os.path.getsize(journal_path)
+    os.replace(journal_path + '.tmp', journal_path)
+    manifest_table.refresh()
+    assert set(manifest_table) == {'base', 'firsx'}
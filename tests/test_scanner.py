@@ -0,0 +1,60 @@
+from rddlrepository.core.scanner import scan_blocks, section_offsets, tokenize
+
+INLINE_INSTANCE = '''
+instance inst_1 {
+    domain = toy;
+    objects {
+        cell : {c1, c2};
+    };
+    non-fluents {
+        COST(c1) = 2.5;
+        ~BLOCKED(c2);
+    };
+    horizon = 40;
+}
+'''
+
+SEPARATE_INSTANCE = '''
+non-fluents nf_1 {
+    domain = toy;
+    objects { cell : {c1, c2}; };
+    non-fluents { COST(c1) = 2.5; };
+}
+
+instance inst_1 {
+    domain = toy;
+    non-fluents = nf_1;
+    horizon = 40;
+}
+'''
+
+
+def _body(text, offsets, section):
+    start, end = offsets[section]
+    return text[start:end]
+
+
+def test_section_offsets_of_inline_non_fluents():
+    offsets = section_offsets(INLINE_INSTANCE)
+    body = _body(INLINE_INSTANCE, offsets, 'non-fluents')
+    assert 'COST(c1) = 2.5;' in body and '~BLOCKED(c2);' in body
+    assert _body(INLINE_INSTANCE, offsets, 'horizon').strip() == '40'
+    assert 'cell' in _body(INLINE_INSTANCE, offsets, 'objects')
+
+
+def test_section_offsets_skip_non_fluents_assignment():
+    offsets = section_offsets(SEPARATE_INSTANCE)
+    assert _body(SEPARATE_INSTANCE, offsets, 'non-fluents').strip() == 'COST(c1) = 2.5;'
+
+
+def test_section_offsets_of_bytes_match_str():
+    data = INLINE_INSTANCE.encode('utf-8')
+    assert section_offsets(memoryview(data)) == section_offsets(INLINE_INSTANCE)
+
+
+def test_scan_blocks_and_tokenize():
+    blocks = scan_blocks(SEPARATE_INSTANCE)
+    assert [(block.kind, block.name) for block in blocks] == \
+        [('non-fluents', 'nf_1'), ('instance', 'inst_1')]
+    values = [token.value for token in tokenize('COST(@c1) = 2.5; // note')]
+    assert values == ['COST', '(', '@c1', ')', '=', '2.5', ';']
@@ -0,0 +1,38 @@
+from rddlrepository.core import table
+
+FIELDS = [('name', table.STRING), ('tags', table.LIST), ('stats', table.JSON),
+          ('data', table.BYTES)]
+RECORDS = [
+    {'name': 'b_problem', 'tags': ['x', 'y'], 'stats': {'1': {'horizon': 40}},
+     'data': b'\x00\x01'},
+    {'name': 'a_problem', 'tags': [], 'stats': None, 'data': b''}
+]
+
+
+def test_pack_table_round_trip():
+    data = table.pack_table(RECORDS, FIELDS, {'contexts': b'{"ctx":["a_problem"]}'})
+    manifest_table = table.ManifestTable(data)
+    assert manifest_table.names() == ('a_problem', 'b_problem')
+    assert manifest_table.find('b_problem') == 1 and manifest_table.find('c') == -1
+    values = manifest_table['b_problem']
+    assert values['tags'] == ('x', 'y')
+    assert values['stats']['1']['horizon'] == 40
+    assert values['data'] == b'\x00\x01'
+    assert manifest_table['a_problem']['tags'] == ()
+    assert manifest_table['a_problem']['stats'] is None
+    assert manifest_table.section_json('contexts') == {'ctx': ['a_problem']}
+    assert manifest_table.section('missing') is None
+    manifest_table.close()
+
+
+def test_encoded_rows_are_copied_as_is(tmp_path):
+    data = table.pack_table(RECORDS, FIELDS)
+    path = str(tmp_path / 'manifest.bin')
+    table.write_bytes(path, data)
+    manifest_table = table.ManifestTable.open(path)
+    try:
+        rows = [manifest_table.encoded_row(row) for row in range(len(manifest_table))]
+        assert isinstance(rows[1]['stats'], table.Encoded)
+        assert table.pack_table(rows, FIELDS) == data
+    finally:
+        manifest_table.close()